@@ -1,9 +1,20 @@
 """Analyzer agents for the AI Resume Reviewer"""
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
-from langchain.output_parsers import PydanticOutputParser
-from app.core.models import get_openai_model, create_prompt
+from langchain_core.output_parsers import PydanticOutputParser
+from app.core.models import get_agent_models, create_prompt
+from app.core.invocation import invoke_chain, ainvoke_chain, ModelOutputError
+from app.core.metrics import PARSE_FAILURES
+from app.core.prompting import (
+    fit_prompt, render_experiences, render_education, render_skills, render_match_analysis,
+    drop_lowest_relevance, shorten_descriptions, drop_last
+)
+from app.core.skills import SkillMatch
 from app.agents.extractors import Experience, Education, Skill
+from app.utils.logger import setup_logging
+
+# Set up logger
+logger = setup_logging()
 
 class MatchAnalysis(BaseModel):
     experience_match: float = Field(description="How well the experience matches the job requirements (0-1)")
@@ -12,6 +23,12 @@ class MatchAnalysis(BaseModel):
     strengths: List[str] = Field(description="Candidate's key strengths for this role")
     gaps: List[str] = Field(description="Identified gaps in candidate's profile")
 
+class MatchNarrative(BaseModel):
+    experience_match: float = Field(description="How well the experience matches the job requirements (0-1)")
+    education_match: float = Field(description="How well the education matches the job requirements (0-1)")
+    strengths: List[str] = Field(description="Candidate's key strengths for this role")
+    gaps: List[str] = Field(description="Identified gaps in candidate's profile, other than the missing skills listed")
+
 class ReviewResult(BaseModel):
     overall_score: float = Field(description="Overall match score (0-1)")
     match_details: MatchAnalysis = Field(description="Detailed match analysis")
@@ -21,14 +38,16 @@ class ReviewResult(BaseModel):
 class MatchAnalyzer:
     """Agent to analyze the match between resume and job description"""
     
+    name = "match_analyzer"
+    
     def __init__(self):
-        self.model = get_openai_model()
+        self.models = get_agent_models(self.name)
         self.parser = PydanticOutputParser(pydantic_object=MatchAnalysis)
         
         self.prompt = create_prompt("""
         You are an AI assistant that analyzes how well a candidate's profile matches a job description.
         
-        Job Description:
+        Job Requirements:
         {job_description}
         
         Candidate's Experience:
@@ -51,45 +70,151 @@ class MatchAnalyzer:
         {format_instructions}
         """)
         
+        # Used when skills were already matched locally: the model only judges the rest
+        self.narrative_parser = PydanticOutputParser(pydantic_object=MatchNarrative)
+        self.narrative_prompt = create_prompt("""
+        You are an AI assistant that analyzes how well a candidate's profile matches a job description.
+        
+        Job Requirements:
+        {job_description}
+        
+        Candidate's Experience:
+        {experiences}
+        
+        Candidate's Education:
+        {education}
+        
+        Skills Coverage (already computed, do not score skills again):
+        {skill_match}
+        
+        Analyze the match between the candidate's experience and education and the job requirements.
+        Provide:
+        - Experience match score (0-1)
+        - Education match score (0-1)
+        - Key strengths relevant to this role
+        - Gaps in the candidate's profile other than the missing skills listed above
+        
+        {format_instructions}
+        """)
+        
     def analyze(self, 
                 job_description: str, 
                 experiences: List[Experience], 
                 education: List[Education], 
-                skills: List[Skill]) -> MatchAnalysis:
+                skills: List[Skill],
+                skill_match: Optional[SkillMatch] = None) -> MatchAnalysis:
         """Analyze match between resume and job description"""
-        response = self.model.invoke(
-            self.prompt.format(
+        return invoke_chain(
+            self.models,
+            self.format_prompt(job_description, experiences, education, skills, skill_match),
+            self.name,
+            lambda text, last: self.parse(text, skill_match)
+        )
+    
+    async def aanalyze(self, 
+                       job_description: str, 
+                       experiences: List[Experience], 
+                       education: List[Education], 
+                       skills: List[Skill],
+                       skill_match: Optional[SkillMatch] = None) -> MatchAnalysis:
+        """Analyze match between resume and job description asynchronously"""
+        return await ainvoke_chain(
+            self.models,
+            self.format_prompt(job_description, experiences, education, skills, skill_match),
+            self.name,
+            lambda text, last: self.parse(text, skill_match)
+        )
+    
+    def format_prompt(self, 
+                      job_description: str, 
+                      experiences: List[Experience], 
+                      education: List[Education], 
+                      skills: List[Skill],
+                      skill_match: Optional[SkillMatch] = None) -> str:
+        """Format the match analysis prompt, trimming the profile to the token budget
+
+        With a precomputed skill match the skills list is replaced by its
+        coverage summary and the model is not asked for a skills score.
+        """
+        experiences = list(experiences)
+        education = list(education)
+        skills = list(skills)
+        
+        if skill_match is not None:
+            format_instructions = self.narrative_parser.get_format_instructions()
+            
+            def build_narrative() -> str:
+                return self.narrative_prompt.format(
+                    job_description=job_description,
+                    experiences=render_experiences(experiences),
+                    education=render_education(education),
+                    skill_match=skill_match.to_prompt(),
+                    format_instructions=format_instructions
+                )
+            
+            return fit_prompt("analyze_match", build_narrative, [
+                shorten_descriptions(experiences, 300),
+                shorten_descriptions(experiences, 100),
+                drop_last(experiences),
+                drop_last(education),
+            ])
+        
+        format_instructions = self.parser.get_format_instructions()
+        
+        def build() -> str:
+            return self.prompt.format(
                 job_description=job_description,
-                experiences=experiences,
-                education=education,
-                skills=skills,
-                format_instructions=self.parser.get_format_instructions()
+                experiences=render_experiences(experiences),
+                education=render_education(education),
+                skills=render_skills(skills),
+                format_instructions=format_instructions
             )
-        )
         
+        # Least relevant skills go first, then detail, then whole entries
+        return fit_prompt("analyze_match", build, [
+            drop_lowest_relevance(skills, keep=10),
+            shorten_descriptions(experiences, 300),
+            shorten_descriptions(experiences, 100),
+            drop_lowest_relevance(skills),
+            drop_last(experiences),
+            drop_last(education),
+        ])
+    
+    def parse(self, text_content: str, skill_match: Optional[SkillMatch] = None) -> MatchAnalysis:
+        """Parse a match analysis from a model response, raising ModelOutputError if it is unusable
+
+        With a precomputed skill match the response only holds the narrative
+        parts, and the skills score and missing-skill gaps come from the match.
+        """
         try:
-            return self.parser.parse(response.content)
-        except Exception as e:
-            print(f"Error parsing match analysis: {e}")
+            if skill_match is None:
+                return self.parser.parse(text_content)
+            narrative = self.narrative_parser.parse(text_content)
             return MatchAnalysis(
-                experience_match=0.0,
-                education_match=0.0,
-                skills_match=0.0,
-                strengths=[],
-                gaps=["Error analyzing resume"]
+                experience_match=narrative.experience_match,
+                education_match=narrative.education_match,
+                skills_match=skill_match.score,
+                strengths=narrative.strengths,
+                gaps=skill_match.gaps() + narrative.gaps
             )
+        except Exception as e:
+            PARSE_FAILURES.inc(agent=self.name)
+            logger.warning(f"Error parsing match analysis: {e}", extra={"agent": self.name})
+            raise ModelOutputError(f"Unusable match analysis from the model: {e}") from e
 
 class ScoreGenerator:
     """Agent to generate overall score and recommendations"""
     
+    name = "score_generator"
+    
     def __init__(self):
-        self.model = get_openai_model()
+        self.models = get_agent_models(self.name)
         self.parser = PydanticOutputParser(pydantic_object=ReviewResult)
         
         self.prompt = create_prompt("""
         You are an AI assistant that generates an overall score and recommendations for a job applicant.
         
-        Job Description:
+        Job Requirements:
         {job_description}
         
         Match Analysis:
@@ -105,21 +230,49 @@ class ScoreGenerator:
         
     def generate(self, job_description: str, match_analysis: MatchAnalysis) -> ReviewResult:
         """Generate overall score and recommendations"""
-        response = self.model.invoke(
-            self.prompt.format(
+        return invoke_chain(
+            self.models,
+            self.format_prompt(job_description, match_analysis),
+            self.name,
+            lambda text, last: self.parse(text, match_analysis)
+        )
+    
+    async def agenerate(self, job_description: str, match_analysis: MatchAnalysis) -> ReviewResult:
+        """Generate overall score and recommendations asynchronously"""
+        return await ainvoke_chain(
+            self.models,
+            self.format_prompt(job_description, match_analysis),
+            self.name,
+            lambda text, last: self.parse(text, match_analysis)
+        )
+    
+    def format_prompt(self, job_description: str, match_analysis: MatchAnalysis) -> str:
+        """Format the scoring prompt, trimming the analysis to the token budget"""
+        format_instructions = self.parser.get_format_instructions()
+        match_analysis = match_analysis.model_copy(update={
+            "strengths": list(match_analysis.strengths),
+            "gaps": list(match_analysis.gaps),
+        })
+        
+        def build() -> str:
+            return self.prompt.format(
                 job_description=job_description,
-                match_analysis=match_analysis,
-                format_instructions=self.parser.get_format_instructions()
+                match_analysis=render_match_analysis(match_analysis),
+                format_instructions=format_instructions
             )
-        )
         
+        return fit_prompt("generate_score", build, [
+            drop_last(match_analysis.strengths),
+            drop_last(match_analysis.gaps),
+        ])
+    
+    def parse(self, text_content: str, match_analysis: MatchAnalysis) -> ReviewResult:
+        """Parse a review result from a model response, raising ModelOutputError if it is unusable"""
         try:
-            return self.parser.parse(response.content)
+            review = self.parser.parse(text_content)
         except Exception as e:
-            print(f"Error parsing review result: {e}")
-            return ReviewResult(
-                overall_score=0.0,
-                match_details=match_analysis,
-                recommendations=["Error generating recommendations"],
-                key_talking_points=[]
-            ) 
\ No newline at end of file
+            PARSE_FAILURES.inc(agent=self.name)
+            logger.warning(f"Error parsing review result: {e}", extra={"agent": self.name})
+            raise ModelOutputError(f"Unusable review result from the model: {e}") from e
+        # The model restates the match details; keep the analysis it was given, whose skills score may be deterministic
+        return review.model_copy(update={"match_details": match_analysis}) 
\ No newline at end of file
@@ -1,10 +1,16 @@
 """Extractor agents for the AI Resume Reviewer"""
-from typing import Dict, Any, List
-from langchain.output_parsers import PydanticOutputParser
+from typing import Dict, Any, List, Optional
+from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field, create_model
-from app.core.models import get_openai_model, create_prompt
-import json
-import re
+from app.core.models import get_agent_models, create_prompt
+from app.core.json_stream import parse_items, parse_first_object
+from app.core.invocation import ModelOutputError, ainvoke_chain, invoke_chain
+from app.core.metrics import PARSE_FAILURES
+from app.core.prompting import fit_text_prompt
+from app.utils.logger import setup_logging
+
+# Set up logger
+logger = setup_logging()
 
 # Define Pydantic models for structured output
 class Experience(BaseModel):
@@ -28,17 +34,59 @@ class Skill(BaseModel):
     level: str = Field(description="Proficiency level (beginner, intermediate, expert)")
     relevance: float = Field(description="Relevance to the job (0-1)")
 
+class JobProfile(BaseModel):
+    title: str = Field(description="Job title")
+    must_have_skills: List[str] = Field(description="Skills the job requires")
+    nice_to_have_skills: List[str] = Field(description="Skills that are preferred but not required")
+    min_years_experience: Optional[float] = Field(default=None, description="Minimum years of relevant experience, if stated")
+    education: List[str] = Field(description="Education requirements")
+    responsibilities: List[str] = Field(description="Key responsibilities, one short phrase each")
+    
+    def to_prompt(self, include_skills: bool = True) -> str:
+        """Render the profile as compact text for prompts, optionally without the skill lists"""
+        lines = [f"Title: {self.title}"]
+        if include_skills and self.must_have_skills:
+            lines.append(f"Must-have skills: {', '.join(self.must_have_skills)}")
+        if include_skills and self.nice_to_have_skills:
+            lines.append(f"Nice-to-have skills: {', '.join(self.nice_to_have_skills)}")
+        if self.min_years_experience is not None:
+            lines.append(f"Minimum experience: {self.min_years_experience:g} years")
+        if self.education:
+            lines.append(f"Education: {'; '.join(self.education)}")
+        if self.responsibilities:
+            lines.append(f"Responsibilities: {'; '.join(self.responsibilities)}")
+        return "\n".join(lines)
+
 # Create list models
 ExperienceList = create_model('ExperienceList', items=(List[Experience], ...))
 EducationList = create_model('EducationList', items=(List[Education], ...))
 SkillList = create_model('SkillList', items=(List[Skill], ...))
 
+def parse_json_list(text_content: str, item_model, label: str, agent: str, strict: bool = False) -> list:
+    """Parse every valid item from a model response, skipping the ones that fail validation
+
+    With strict, raise ModelOutputError instead when any item fails validation
+    or the response holds no JSON, so a stronger model can be tried.
+    """
+    errors = []
+    def report(error):
+        PARSE_FAILURES.inc(agent=agent)
+        errors.append(error)
+        logger.warning(f"Error parsing single {label}: {error}", extra={"agent": agent})
+    items = parse_items(text_content, item_model, on_error=report)
+    if strict and errors:
+        raise ModelOutputError(f"Invalid {label} in the model response: {errors[0]}")
+    if strict and not items and "[" not in text_content:
+        raise ModelOutputError(f"No {label} list in the model response")
+    return items
+
 class ExperienceExtractor:
     """Agent to extract work experience from a resume"""
     
+    name = "experience_extractor"
+    
     def __init__(self):
-        self.model = get_openai_model()
-        self.single_parser = PydanticOutputParser(pydantic_object=Experience)
+        self.models = get_agent_models(self.name)
         self.list_parser = PydanticOutputParser(pydantic_object=ExperienceList)
         
         self.prompt = create_prompt("""
@@ -72,48 +120,35 @@ class ExperienceExtractor:
         
     def extract(self, resume: str) -> List[Experience]:
         """Extract work experience from resume"""
-        response = self.model.invoke(
-            self.prompt.format(
-                resume=resume
-            )
+        return invoke_chain(self.models, self.format_prompt(resume), self.name, self._parse_tier)
+    
+    async def aextract(self, resume: str) -> List[Experience]:
+        """Extract work experience from resume asynchronously"""
+        return await ainvoke_chain(self.models, self.format_prompt(resume), self.name, self._parse_tier)
+    
+    def format_prompt(self, resume: str) -> str:
+        """Format the extraction prompt, truncating the resume to the token budget"""
+        return fit_text_prompt(
+            "extract_experience",
+            lambda text: self.prompt.format(resume=text),
+            resume
         )
-        
-        experiences = []
-        try:
-            # Extract JSON from the response
-            text_content = response.content
-            # Find JSON array using regex
-            matches = re.search(r'(\[.*\])', text_content, re.DOTALL)
-            if matches:
-                json_str = matches.group(1)
-                # Parse the JSON
-                experience_list = json.loads(json_str)
-                
-                # Parse each experience
-                for exp_data in experience_list:
-                    try:
-                        exp = Experience(**exp_data)
-                        experiences.append(exp)
-                    except Exception as e:
-                        print(f"Error parsing single experience: {e}")
-            else:
-                # Try to parse as a single object
-                try:
-                    exp = self.single_parser.parse(text_content)
-                    experiences.append(exp)
-                except Exception as e:
-                    print(f"Error parsing as single experience: {e}")
-        except Exception as e:
-            print(f"Error parsing experiences: {e}")
-            
-        return experiences
+    
+    def _parse_tier(self, text_content: str, last: bool):
+        """Parse a response, rejecting invalid output unless no stronger model is left"""
+        return self.parse(text_content, strict=not last)
+    
+    def parse(self, text_content: str, strict: bool = False) -> List[Experience]:
+        """Parse work experiences from a model response"""
+        return parse_json_list(text_content, Experience, "experience", self.name, strict)
 
 class EducationExtractor:
     """Agent to extract education information from a resume"""
     
+    name = "education_extractor"
+    
     def __init__(self):
-        self.model = get_openai_model()
-        self.single_parser = PydanticOutputParser(pydantic_object=Education)
+        self.models = get_agent_models(self.name)
         self.list_parser = PydanticOutputParser(pydantic_object=EducationList)
         
         self.prompt = create_prompt("""
@@ -146,48 +181,35 @@ class EducationExtractor:
         
     def extract(self, resume: str) -> List[Education]:
         """Extract education from resume"""
-        response = self.model.invoke(
-            self.prompt.format(
-                resume=resume
-            )
+        return invoke_chain(self.models, self.format_prompt(resume), self.name, self._parse_tier)
+    
+    async def aextract(self, resume: str) -> List[Education]:
+        """Extract education from resume asynchronously"""
+        return await ainvoke_chain(self.models, self.format_prompt(resume), self.name, self._parse_tier)
+    
+    def format_prompt(self, resume: str) -> str:
+        """Format the extraction prompt, truncating the resume to the token budget"""
+        return fit_text_prompt(
+            "extract_education",
+            lambda text: self.prompt.format(resume=text),
+            resume
         )
-        
-        educations = []
-        try:
-            # Extract JSON from the response
-            text_content = response.content
-            # Find JSON array using regex
-            matches = re.search(r'(\[.*\])', text_content, re.DOTALL)
-            if matches:
-                json_str = matches.group(1)
-                # Parse the JSON
-                education_list = json.loads(json_str)
-                
-                # Parse each education entry
-                for edu_data in education_list:
-                    try:
-                        edu = Education(**edu_data)
-                        educations.append(edu)
-                    except Exception as e:
-                        print(f"Error parsing single education entry: {e}")
-            else:
-                # Try to parse as a single object
-                try:
-                    edu = self.single_parser.parse(text_content)
-                    educations.append(edu)
-                except Exception as e:
-                    print(f"Error parsing as single education entry: {e}")
-        except Exception as e:
-            print(f"Error parsing education: {e}")
-            
-        return educations
+    
+    def _parse_tier(self, text_content: str, last: bool):
+        """Parse a response, rejecting invalid output unless no stronger model is left"""
+        return self.parse(text_content, strict=not last)
+    
+    def parse(self, text_content: str, strict: bool = False) -> List[Education]:
+        """Parse education entries from a model response"""
+        return parse_json_list(text_content, Education, "education entry", self.name, strict)
 
 class SkillsExtractor:
     """Agent to extract skills information from a resume"""
     
+    name = "skills_extractor"
+    
     def __init__(self):
-        self.model = get_openai_model()
-        self.single_parser = PydanticOutputParser(pydantic_object=Skill)
+        self.models = get_agent_models(self.name)
         self.list_parser = PydanticOutputParser(pydantic_object=SkillList)
         
         self.prompt = create_prompt("""
@@ -196,14 +218,14 @@ class SkillsExtractor:
         Resume:
         {resume}
         
-        Job Description:
+        Job Requirements:
         {job_description}
         
         Extract all skills from this resume. Return a list of skills, for each skill, provide:
         - Name of the skill
         - Category (technical, soft, domain)
         - Estimated proficiency level
-        - Relevance score (0-1) to the provided job description
+        - Relevance score (0-1) to the provided job requirements
         
         Format your response as a JSON list of objects where each object represents one skill.
         
@@ -221,39 +243,200 @@ class SkillsExtractor:
         
     def extract(self, resume: str, job_description: str) -> List[Skill]:
         """Extract skills from resume"""
-        response = self.model.invoke(
-            self.prompt.format(
-                resume=resume,
-                job_description=job_description
-            )
+        return invoke_chain(self.models, self.format_prompt(resume, job_description), self.name, self._parse_tier)
+    
+    async def aextract(self, resume: str, job_description: str) -> List[Skill]:
+        """Extract skills from resume asynchronously"""
+        return await ainvoke_chain(self.models, self.format_prompt(resume, job_description), self.name, self._parse_tier)
+    
+    def format_prompt(self, resume: str, job_description: str) -> str:
+        """Format the extraction prompt, truncating the resume to the token budget"""
+        return fit_text_prompt(
+            "extract_skills",
+            lambda text: self.prompt.format(resume=text, job_description=job_description),
+            resume
         )
+    
+    def _parse_tier(self, text_content: str, last: bool):
+        """Parse a response, rejecting invalid output unless no stronger model is left"""
+        return self.parse(text_content, strict=not last)
+    
+    def parse(self, text_content: str, strict: bool = False) -> List[Skill]:
+        """Parse skills from a model response"""
+        return parse_json_list(text_content, Skill, "skill", self.name, strict)
+
+
+class CombinedExtractor:
+    """Agent to extract experience, education and skills from a resume in one call"""
+    
+    name = "combined_extractor"
+    
+    # Section name in the response and the model each item is validated against
+    SECTIONS = {
+        "experiences": Experience,
+        "education": Education,
+        "skills": Skill,
+    }
+    
+    def __init__(self):
+        self.models = get_agent_models(self.name)
         
-        skills = []
+        self.prompt = create_prompt("""
+        You are an AI assistant that extracts structured information from resumes.
+        
+        Resume:
+        {resume}
+        
+        Job Requirements:
+        {job_description}
+        
+        Extract from this resume:
+        - "experiences": every work experience, with company name, job title, start and end dates,
+          a description of responsibilities and achievements, and the skills demonstrated
+        - "education": every education entry, with institution name, degree earned, field of study,
+          graduation date and notable achievements
+        - "skills": every skill, with its name, category (technical, soft, domain), estimated
+          proficiency level and a relevance score (0-1) to the provided job requirements
+        
+        Format your response as a single JSON object with those three keys, each holding a list.
+        
+        Example format:
+        {{
+            "experiences": [
+                {{
+                    "company": "Company Name",
+                    "title": "Job Title",
+                    "start_date": "Start Date",
+                    "end_date": "End Date",
+                    "description": "Description of responsibilities",
+                    "skills_used": ["Skill 1", "Skill 2"]
+                }}
+            ],
+            "education": [
+                {{
+                    "institution": "University Name",
+                    "degree": "Degree Earned",
+                    "field_of_study": "Field of Study",
+                    "graduation_date": "Graduation Date",
+                    "achievements": ["Achievement 1", "Achievement 2"]
+                }}
+            ],
+            "skills": [
+                {{
+                    "name": "Skill Name",
+                    "category": "Category",
+                    "level": "Proficiency Level",
+                    "relevance": 0.8
+                }}
+            ]
+        }}
+        """)
+        
+    def extract(self, resume: str, job_description: str) -> Dict[str, Optional[list]]:
+        """Extract all sections from resume; sections that fail validation are None"""
+        return invoke_chain(self.models, self.format_prompt(resume, job_description), self.name, self._parse_tier)
+    
+    async def aextract(self, resume: str, job_description: str) -> Dict[str, Optional[list]]:
+        """Extract all sections from resume asynchronously; sections that fail validation are None"""
+        return await ainvoke_chain(self.models, self.format_prompt(resume, job_description), self.name, self._parse_tier)
+    
+    def format_prompt(self, resume: str, job_description: str) -> str:
+        """Format the extraction prompt, truncating the resume to the token budget"""
+        return fit_text_prompt(
+            "extract_fused",
+            lambda text: self.prompt.format(resume=text, job_description=job_description),
+            resume
+        )
+    
+    def _parse_tier(self, text_content: str, last: bool):
+        """Parse a response on any tier without rejecting it
+
+        Escalating would send the whole fused prompt again for one bad section;
+        the workflow instead re-asks only the failed sections, through the
+        per-section extractors, which escalate on their own.
+        """
+        return self.parse(text_content)
+    
+    def parse(self, text_content: str) -> Dict[str, Optional[list]]:
+        """Parse and validate each section of a combined response independently"""
+        sections = {name: None for name in self.SECTIONS}
+        data = parse_first_object(text_content)
+        if data is None:
+            PARSE_FAILURES.inc(agent=self.name)
+            logger.warning("Error parsing combined extraction: no complete JSON object in response",
+                           extra={"agent": self.name})
+            return sections
+        
+        for name, item_model in self.SECTIONS.items():
+            section = data.get(name)
+            if not isinstance(section, list):
+                PARSE_FAILURES.inc(agent=self.name)
+                logger.warning(f"Missing {name} in combined extraction", extra={"agent": self.name})
+                continue
+            try:
+                sections[name] = [item_model(**item_data) for item_data in section]
+            except Exception as e:
+                PARSE_FAILURES.inc(agent=self.name)
+                logger.warning(f"Error validating {name} in combined extraction: {e}", extra={"agent": self.name})
+        
+        return sections
+
+
+class JobProfileExtractor:
+    """Agent to distill a job description into a compact requirements profile"""
+    
+    name = "job_profile_extractor"
+    
+    def __init__(self):
+        self.models = get_agent_models(self.name)
+        self.parser = PydanticOutputParser(pydantic_object=JobProfile)
+        
+        self.prompt = create_prompt("""
+        You are an AI assistant that summarizes job descriptions into structured requirements.
+        
+        Job Description:
+        {job_description}
+        
+        Extract the requirements a candidate is screened against:
+        - Job title
+        - Must-have skills and nice-to-have skills, as short skill names
+        - Minimum years of relevant experience, if stated
+        - Education requirements
+        - Key responsibilities, one short phrase each
+        
+        Leave out company marketing, benefits and application instructions.
+        
+        {format_instructions}
+        """)
+        
+    def extract(self, job_description: str) -> Optional[JobProfile]:
+        """Extract a requirements profile from a job description"""
+        return invoke_chain(self.models, self.format_prompt(job_description), self.name, self._parse_tier)
+    
+    async def aextract(self, job_description: str) -> Optional[JobProfile]:
+        """Extract a requirements profile from a job description asynchronously"""
+        return await ainvoke_chain(self.models, self.format_prompt(job_description), self.name, self._parse_tier)
+    
+    def format_prompt(self, job_description: str) -> str:
+        """Format the job profile prompt, truncating the job description to the token budget"""
+        format_instructions = self.parser.get_format_instructions()
+        return fit_text_prompt(
+            "profile_job",
+            lambda text: self.prompt.format(job_description=text, format_instructions=format_instructions),
+            job_description
+        )
+    
+    def _parse_tier(self, text_content: str, last: bool):
+        """Parse a response, rejecting invalid output unless no stronger model is left"""
+        return self.parse(text_content, strict=not last)
+    
+    def parse(self, text_content: str, strict: bool = False) -> Optional[JobProfile]:
+        """Parse a job profile from a model response, raising ModelOutputError with strict"""
         try:
-            # Extract JSON from the response
-            text_content = response.content
-            # Find JSON array using regex
-            matches = re.search(r'(\[.*\])', text_content, re.DOTALL)
-            if matches:
-                json_str = matches.group(1)
-                # Parse the JSON
-                skill_list = json.loads(json_str)
-                
-                # Parse each skill
-                for skill_data in skill_list:
-                    try:
-                        skill = Skill(**skill_data)
-                        skills.append(skill)
-                    except Exception as e:
-                        print(f"Error parsing single skill: {e}")
-            else:
-                # Try to parse as a single object
-                try:
-                    skill = self.single_parser.parse(text_content)
-                    skills.append(skill)
-                except Exception as e:
-                    print(f"Error parsing as single skill: {e}")
+            return self.parser.parse(text_content)
         except Exception as e:
-            print(f"Error parsing skills: {e}")
-            
-        return skills 
\ No newline at end of file
+            PARSE_FAILURES.inc(agent=self.name)
+            logger.warning(f"Error parsing job profile: {e}", extra={"agent": self.name})
+            if strict:
+                raise ModelOutputError(f"Unusable job profile from the model: {e}") from e
+            return None
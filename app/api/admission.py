@@ -0,0 +1,62 @@
+"""Admission control for the AI Resume Reviewer API"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+from app.core.metrics import ADMISSION_REJECTIONS
+
+class AdmissionController:
+    """Bounds in-flight reviews and rejects requests early once the queue is full"""
+    
+    def __init__(self, max_in_flight: int, max_queue: int, max_wait: float):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        
+    def check(self):
+        """Reject straight away when every slot is busy and the queue is full"""
+        if self.in_flight + self.waiting >= self.max_in_flight + self.max_queue:
+            ADMISSION_REJECTIONS.inc(reason="queue_full")
+            raise HTTPException(
+                status_code=429,
+                detail="Too many reviews in progress, please retry later",
+                headers={"Retry-After": str(max(1, int(self.max_wait)))}
+            )
+        
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one in-flight slot for the duration of the block"""
+        self.check()
+        
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            ADMISSION_REJECTIONS.inc(reason="wait_timeout")
+            raise HTTPException(
+                status_code=503,
+                detail="Timed out waiting for a free review slot",
+                headers={"Retry-After": str(max(1, int(self.max_wait)))}
+            )
+        finally:
+            self.waiting -= 1
+        
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+def create_admission_controller() -> AdmissionController:
+    """Create an admission controller from environment variables"""
+    return AdmissionController(
+        max_in_flight=int(os.getenv("REVIEW_MAX_IN_FLIGHT", "8")),
+        max_queue=int(os.getenv("REVIEW_MAX_QUEUE", "32")),
+        max_wait=float(os.getenv("REVIEW_MAX_WAIT_SECONDS", "10")),
+    )
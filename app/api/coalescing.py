@@ -0,0 +1,83 @@
+"""Coalescing of identical in-flight requests for the AI Resume Reviewer API"""
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict
+from fastapi import Request
+from app.core.metrics import REVIEW_COALESCED
+
+class ClientDisconnected(Exception):
+    """The client went away before its result was ready"""
+
+class _Flight:
+    """One shared execution and the number of callers waiting on it"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Runs one execution per key at a time and hands its outcome to every caller that asks meanwhile
+
+    The execution runs in its own task, so a caller going away does not stop
+    it for the others. It is only cancelled once every caller waiting on it
+    has gone, and a caller arriving after that starts a new one. Exceptions
+    are raised to every waiting caller.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Await func(), or the execution already in flight for the same key"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(func()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finish(key, flight))
+        else:
+            REVIEW_COALESCED.inc()
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller has gone, so nobody needs the result
+                self._finish(key, flight)
+                flight.task.cancel()
+
+    def _finish(self, key: str, flight: _Flight):
+        """Forget a flight so the next caller with its key starts afresh"""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+async def _wait_for_disconnect(request: Request):
+    """Return once the client has disconnected"""
+    # The body has been read, so the only message left to receive is the disconnect;
+    # waiting on it works through the HTTP middleware, where is_disconnected() cannot
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+async def unless_disconnected(request: Request, awaitable: Awaitable[Any]) -> Any:
+    """Await a result, giving up on it with ClientDisconnected if the client goes away first"""
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+    if task in done:
+        return task.result()
+    # Let the cancelled caller leave its flight before reporting the disconnect
+    await asyncio.gather(task, return_exceptions=True)
+    raise ClientDisconnected()
+
+def coalescing_enabled() -> bool:
+    """Check whether identical in-flight reviews share one workflow run"""
+    return os.getenv("REVIEW_COALESCING_ENABLED", "true").lower() == "true"
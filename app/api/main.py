@@ -1,73 +1,449 @@
 """API endpoints for the AI Resume Reviewer"""
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+from dotenv import load_dotenv
+import asyncio
 import os
 import json
-from app.core.workflow import create_resume_review_graph
-from app.utils.logger import setup_logging
+import threading
+import time
+
+# Load environment variables before the app modules below read them on import
+load_dotenv()
+
+from app.api.admission import create_admission_controller
+from app.api.coalescing import ClientDisconnected, SingleFlight, coalescing_enabled, unless_disconnected
+from app.core.cache import content_hash
+from app.core.invocation import ModelOutputError, ModelUnavailableError
+from app.core.jobs import JobFailed, JobWorkerPool, create_job_queue, get_job_workers
+from app.core.metrics import Counter, Gauge, HTTP_LATENCY, REVIEW_REUSES, registry as metrics_registry, render_metrics, snapshot
+from app.core.prompting import get_token_stats
+from app.core.registry import awarm_connections, get_graph, get_extraction_cache, prewarm
+from app.utils.logger import correlation_scope, get_dropped_records, setup_logging
+from app.utils.serialization import to_jsonable
 
 # Set up logging
 logger = setup_logging()
 
+# Durable review jobs and the workers that run them, created on first use
+job_queue = None
+job_workers = None
+
+# Index of reviewed resumes for reusing reviews of near-identical ones, created on first use
+near_duplicate_index = None
+near_duplicate_lock = threading.Lock()
+
+# Reviews running in this process, shared by identical requests that arrive meanwhile
+review_flights = SingleFlight()
+
+def get_job_queue():
+    """Get the shared review job queue"""
+    global job_queue
+    if job_queue is None:
+        job_queue = create_job_queue()
+    return job_queue
+
+def get_near_duplicate_index():
+    """Get the shared near-duplicate review index, or None when it is disabled"""
+    global near_duplicate_index
+    # Lookups run in worker threads, so only one of them may create the index
+    with near_duplicate_lock:
+        if near_duplicate_index is None:
+            # The index needs NumPy, so it is imported on first use
+            from app.core.near_duplicates import create_near_duplicate_index, near_duplicates_enabled
+            if not near_duplicates_enabled():
+                return None
+            near_duplicate_index = create_near_duplicate_index()
+    return near_duplicate_index
+
+def format_review(review_result) -> Dict[str, Any]:
+    """Convert a review result to the API response format"""
+    return {
+        "overall_score": review_result.overall_score,
+        "experience_match": review_result.match_details.experience_match,
+        "education_match": review_result.match_details.education_match,
+        "skills_match": review_result.match_details.skills_match,
+        "strengths": review_result.match_details.strengths,
+        "gaps": review_result.match_details.gaps,
+        "recommendations": review_result.recommendations,
+        "key_talking_points": review_result.key_talking_points
+    }
+
+def review_cache_enabled() -> bool:
+    """Check whether finished reviews are stored for identical requests"""
+    return os.getenv("REVIEW_CACHE_ENABLED", "true").lower() == "true"
+
+def get_cached_review(resume: str, job_description: str) -> Optional[Dict[str, Any]]:
+    """Get a finished review of the same or a near-identical resume and the same job description
+
+    A near-identical resume's review is marked with reused_from: the stored
+    entry's ID, the estimated similarity and the lines that changed. This
+    blocks on SQLite and the line diff, so async code runs it in a thread.
+    """
+    if review_cache_enabled():
+        cached = get_extraction_cache().get("review", content_hash(resume, job_description))
+        if cached is not None:
+            REVIEW_REUSES.inc(match="exact")
+            return cached
+    
+    index = get_near_duplicate_index()
+    match = index.find(resume, job_description) if index is not None else None
+    if match is None:
+        return None
+    REVIEW_REUSES.inc(match="near_duplicate")
+    logger.info(f"Reusing review {match['id']} of a resume with similarity {match['similarity']}")
+    return {
+        **match["review"],
+        "reused_from": {"id": match["id"], "similarity": match["similarity"], "changes": match["changes"]}
+    }
+
+def store_review(resume: str, job_description: str, review: Dict[str, Any]):
+    """Store a finished review where every worker process can find it; this blocks on SQLite"""
+    if review_cache_enabled():
+        get_extraction_cache().set("review", content_hash(resume, job_description), review)
+    index = get_near_duplicate_index()
+    if index is not None:
+        index.add(resume, job_description, review)
+
+async def execute_review(resume: str, job_description: str) -> Dict[str, Any]:
+    """Run the workflow for a review, storing the review if one was produced"""
+    result = await get_graph().ainvoke({
+        "resume": resume,
+        "job_description": job_description
+    })
+    if "review_result" in result:
+        await asyncio.to_thread(store_review, resume, job_description, format_review(result["review_result"]))
+    return result
+
+async def coalesce_review(resume: str, job_description: str,
+                          func: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Run a review, or join the identical review already running in this process"""
+    if not coalescing_enabled():
+        return await func()
+    return await review_flights.run(content_hash(resume, job_description), func)
+
+async def run_review_job(resume: str, job_description: str) -> Dict[str, Any]:
+    """Run a queued review through the workflow"""
+    cached = await asyncio.to_thread(get_cached_review, resume, job_description)
+    if cached is not None:
+        return cached
+    result = await coalesce_review(resume, job_description, lambda: execute_review(resume, job_description))
+    if "review_result" not in result:
+        raise JobFailed("Could not extract experience, education or skills from the resume")
+    return format_review(result["review_result"])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prewarm and start the review workers with the server, and stop them on shutdown"""
+    global job_workers
+    if os.getenv("PREWARM_ON_STARTUP", "true").lower() == "true":
+        # Requests are only accepted once startup finishes, so the first one is not the slowest
+        elapsed = await asyncio.to_thread(prewarm)
+        logger.info(f"Prewarmed agents, graph and caches in {elapsed:.2f}s")
+        try:
+            await asyncio.wait_for(awarm_connections(), timeout=10)
+        except Exception as e:
+            logger.warning(f"Could not prewarm model connections: {str(e)}")
+        await asyncio.to_thread(get_near_duplicate_index)
+    
+    workers = get_job_workers()
+    if workers > 0:
+        queue = get_job_queue()
+        queue.purge()
+        job_workers = JobWorkerPool(
+            queue,
+            run_review_job,
+            workers,
+            poll_interval=float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+        )
+        job_workers.start()
+    try:
+        yield
+    finally:
+        if job_workers is not None:
+            await job_workers.stop()
+            job_workers = None
+
 # Create app
 app = FastAPI(
     title="AI Resume Reviewer",
     description="API for analyzing resumes against job descriptions",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Limit the number of reviews running at once
+admission = create_admission_controller()
+
+def collect_live_metrics():
+    """Read admission, cache and prompt budget state for a metrics scrape"""
+    cache = get_extraction_cache().get_stats()
+    prompts = get_token_stats()
+    jobs = job_queue.get_counts() if job_queue is not None else {}
+    return [
+        snapshot(Gauge, "resume_reviewer_reviews_in_flight",
+                 "Reviews currently holding an admission slot", [], {(): admission.in_flight}),
+        snapshot(Gauge, "resume_reviewer_reviews_waiting",
+                 "Reviews waiting for an admission slot", [], {(): admission.waiting}),
+        snapshot(Gauge, "resume_reviewer_review_flights",
+                 "Distinct reviews running, each shared by every identical request", [], {(): len(review_flights)}),
+        snapshot(Counter, "resume_reviewer_extraction_cache_lookups_total",
+                 "Extraction cache lookups by outcome", ["result"], {
+                     ("memory_hit",): cache["memory_hits"],
+                     ("disk_hit",): cache["disk_hits"],
+                     ("miss",): cache["misses"],
+                 }),
+        snapshot(Gauge, "resume_reviewer_extraction_cache_hit_ratio",
+                 "Share of extraction cache lookups served from either tier", [], {(): cache["hit_rate"]}),
+        snapshot(Counter, "resume_reviewer_node_prompt_tokens_total",
+                 "Prompt tokens counted locally before sending, per node", ["node"],
+                 {(node,): stats["prompt_tokens"] for node, stats in prompts.items()}),
+        snapshot(Gauge, "resume_reviewer_review_jobs",
+                 "Review jobs in the durable queue by status", ["status"],
+                 {(status,): count for status, count in jobs.items()}),
+        snapshot(Counter, "resume_reviewer_node_prompts_truncated_total",
+                 "Prompts cut down to fit the node's token budget", ["node"],
+                 {(node,): stats["truncated_prompts"] for node, stats in prompts.items()}),
+        snapshot(Counter, "resume_reviewer_log_records_dropped_total",
+                 "Log records dropped because the log queue was full", [], {(): get_dropped_records()}),
+    ]
+
+metrics_registry.add_collector(collect_live_metrics)
+
+# Longest correlation ID accepted from a client
+MAX_CORRELATION_ID_LENGTH = 64
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Time each request by route and tag its logs with a correlation ID; streaming routes are timed to the start of the response"""
+    start = time.perf_counter()
+    status = 500
+    # A client's X-Correlation-ID is kept so its logs join ours
+    requested = request.headers.get("X-Correlation-ID", "")[:MAX_CORRELATION_ID_LENGTH]
+    try:
+        with correlation_scope(requested or None) as correlation_id:
+            response = await call_next(request)
+        response.headers["X-Correlation-ID"] = correlation_id
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_LATENCY.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status
+        )
+
 # Define request models
 class ReviewRequest(BaseModel):
     resume: str
     job_description: str
 
+class RankCandidate(BaseModel):
+    id: Optional[str] = None
+    resume: str
+
+class RankRequest(BaseModel):
+    job_description: str
+    resumes: List[RankCandidate]
+    max_workers: Optional[int] = None
+    prescreen_min_coverage: Optional[float] = None
+    prescreen_top_k: Optional[int] = None
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
     return {"status": "ok", "message": "AI Resume Reviewer API is running"}
 
+@app.get("/stats")
+async def stats():
+    """Prompt token counts per node and extraction cache counters"""
+    return {
+        "prompt_tokens": get_token_stats(),
+        "extraction_cache": get_extraction_cache().get_stats()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for nodes, agents, tokens, parsing, the cache and admission"""
+    # Collectors read the shared SQLite stores, so the scrape runs off the event loop
+    return PlainTextResponse(await asyncio.to_thread(render_metrics), media_type="text/plain; version=0.0.4")
+
 @app.post("/review")
-async def review_resume(request: ReviewRequest):
+async def review_resume(request: ReviewRequest, http_request: Request):
     """Review a resume against a job description"""
     try:
-        # Create the workflow graph
-        graph = create_resume_review_graph()
+        # Identical requests reuse the review any worker process already finished
+        cached = await asyncio.to_thread(get_cached_review, request.resume, request.job_description)
+        if cached is not None:
+            return cached
         
-        # Prepare input
-        inputs = {
-            "resume": request.resume,
-            "job_description": request.job_description
-        }
+        # Execute the graph once a slot is free
+        async def run():
+            async with admission.slot():
+                logger.info("Starting resume review workflow")
+                return await execute_review(request.resume, request.job_description)
         
-        # Execute the graph
-        logger.info("Starting resume review workflow")
-        result = graph.invoke(inputs)
+        # Identical requests arriving meanwhile wait for this run instead of starting their own,
+        # and the run is cancelled once every client waiting on it has disconnected
+        result = await unless_disconnected(
+            http_request,
+            coalesce_review(request.resume, request.job_description, run)
+        )
         
         # Format response
         if "review_result" in result:
-            review_result = result["review_result"]
-            
-            # Convert to JSON-serializable format
-            response = {
-                "overall_score": review_result.overall_score,
-                "experience_match": review_result.match_details.experience_match,
-                "education_match": review_result.match_details.education_match,
-                "skills_match": review_result.match_details.skills_match,
-                "strengths": review_result.match_details.strengths,
-                "gaps": review_result.match_details.gaps,
-                "recommendations": review_result.recommendations,
-                "key_talking_points": review_result.key_talking_points
-            }
-            
-            return response
+            return format_review(result["review_result"])
+        elif result.get("match_analysis") is None:
+            raise HTTPException(
+                status_code=422,
+                detail="Could not extract experience, education or skills from the resume"
+            )
         else:
             raise HTTPException(status_code=500, detail="Review processing failed")
     
+    except HTTPException:
+        raise
+    except ClientDisconnected:
+        logger.info("Client disconnected, leaving review")
+        # Nobody reads the response; 499 marks the request as abandoned in the latency metrics
+        return Response(status_code=499)
+    except ModelUnavailableError as e:
+        logger.error(f"Model unavailable for review: {str(e)}")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Model unavailable: {str(e)}",
+            headers={"Retry-After": str(max(1, int(e.retry_after)))}
+        )
+    except ModelOutputError as e:
+        logger.error(f"Unusable model output for review: {str(e)}")
+        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing review: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing review: {str(e)}")
 
+@app.post("/reviews", status_code=202)
+async def submit_review(request: ReviewRequest):
+    """Queue a review and return its job ID straight away"""
+    job = await asyncio.to_thread(get_job_queue().submit, request.resume, request.job_description)
+    if job_workers is not None:
+        job_workers.notify()
+    return JSONResponse(
+        status_code=202,
+        content=job,
+        headers={"Location": f"/reviews/{job['id']}"}
+    )
+
+@app.get("/reviews/{job_id}")
+async def get_review(job_id: str):
+    """Get the status of a queued review, and its result once done"""
+    job = await asyncio.to_thread(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Review job not found")
+    return job
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/review/stream")
+async def review_resume_stream(request: ReviewRequest, http_request: Request):
+    """Review a resume, streaming each workflow node's output as a server-sent event"""
+    # Reject before streaming starts if the server is already saturated
+    admission.check()
+    
+    inputs = {
+        "resume": request.resume,
+        "job_description": request.job_description
+    }
+    
+    async def stream():
+        try:
+            async with admission.slot():
+                logger.info("Starting streaming resume review workflow")
+                graph = get_graph()
+                # Loaded with the graph, so importing it here keeps the workflow lazy
+                from app.core.workflow import JOIN_NODES
+                async for update in graph.astream(inputs, stream_mode="updates"):
+                    # Stop the remaining model calls once the client has gone
+                    if await http_request.is_disconnected():
+                        logger.info("Client disconnected, cancelling review")
+                        return
+                    for node, output in update.items():
+                        if node not in JOIN_NODES:
+                            yield _sse(node, to_jsonable(output or {}))
+        except HTTPException as e:
+            yield _sse("error", {"error": e.detail})
+            return
+        except Exception as e:
+            logger.error(f"Error streaming review: {str(e)}")
+            yield _sse("error", {"error": f"Error processing review: {str(e)}"})
+            return
+        
+        yield _sse("done", {})
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/rank")
+async def rank(request: RankRequest):
+    """Rank many resumes against one job description, streaming results as NDJSON"""
+    if not request.resumes:
+        raise HTTPException(status_code=400, detail="No resumes to rank")
+    if request.max_workers is not None and request.max_workers < 1:
+        raise HTTPException(status_code=400, detail="max_workers must be at least 1")
+    
+    # Reject before streaming starts if the server is already saturated
+    admission.check()
+    
+    # Ranking pulls in NumPy and the workflow, so it is imported on first use
+    from app.core.prescreen import get_prescreen_settings
+    from app.core.ranking import rank_resumes, sort_ranking
+    
+    candidates = [
+        (candidate.id or str(index), candidate.resume)
+        for index, candidate in enumerate(request.resumes)
+    ]
+    
+    # Request cutoffs override the configured defaults
+    screening = get_prescreen_settings()
+    if request.prescreen_min_coverage is not None:
+        screening["min_coverage"] = request.prescreen_min_coverage
+    if request.prescreen_top_k is not None:
+        screening["top_k"] = request.prescreen_top_k
+    
+    async def stream():
+        entries = []
+        try:
+            async with admission.slot():
+                logger.info(f"Ranking {len(candidates)} resumes")
+                async for entry in rank_resumes(
+                    request.job_description,
+                    candidates,
+                    request.max_workers,
+                    **screening
+                ):
+                    entries.append(entry)
+                    yield json.dumps({"event": "result", **entry}) + "\n"
+        except HTTPException as e:
+            yield json.dumps({"event": "error", "error": e.detail}) + "\n"
+            return
+        except Exception as e:
+            logger.error(f"Error ranking resumes: {str(e)}")
+            yield json.dumps({"event": "error", "error": f"Error processing ranking: {str(e)}"}) + "\n"
+            return
+        
+        yield json.dumps({"event": "ranking", "results": sort_ranking(entries)}) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""Bulk reviews of many resumes against many job descriptions, resumable from their JSONL output"""
+import asyncio
+import glob
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Set, Tuple
+from app.core.cache import content_hash
+from app.core.ranking import summarize_result
+from app.core.registry import get_graph
+from app.core.workflow import aget_job_profile, job_profile_enabled
+from app.utils.logger import correlation_scope, setup_logging
+
+# Set up logger
+logger = setup_logging()
+
+# Files picked up when a directory is given
+TEXT_EXTENSIONS = (".txt", ".md")
+
+def expand_paths(patterns: Iterable[str]) -> List[str]:
+    """Expand files, directories and glob patterns into a sorted list of files"""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for name in os.listdir(pattern):
+                path = os.path.join(pattern, name)
+                if os.path.isfile(path) and name.lower().endswith(TEXT_EXTENSIONS):
+                    paths.add(path)
+            continue
+        matches = [path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path)]
+        if not matches:
+            raise ValueError(f"No files match {pattern}")
+        paths.update(matches)
+    return sorted(paths)
+
+def read_pairs_file(path: str) -> List[Tuple[str, str]]:
+    """Read explicit (resume, job description) path pairs, one comma- or tab-separated pair per line"""
+    pairs = []
+    with open(path, "r") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = [part.strip() for part in line.replace("\t", ",").split(",")]
+            if len(parts) != 2 or not all(parts):
+                raise ValueError(f"{path}:{number}: expected 'resume,job_description'")
+            pairs.append((parts[0], parts[1]))
+    return pairs
+
+def pair_key(resume_path: str, jd_path: str, resume: str, job_description: str) -> str:
+    """Identify a pair by its paths and contents, so edited files are reviewed again"""
+    return content_hash(resume_path, jd_path, resume, job_description)
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """Get the keys of pairs already reviewed successfully in an earlier run's output"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A run killed mid-write can leave a partial last line
+                continue
+            if record.get("status") == "ok" and record.get("key"):
+                done.add(record["key"])
+    return done
+
+def format_duration(seconds: float) -> str:
+    """Format seconds as e.g. 1h02m, 3m05s or 42s"""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+def format_progress(done: int, total: int, elapsed: float) -> str:
+    """Describe progress with throughput and the estimated time left"""
+    rate = done / elapsed if elapsed > 0 else 0.0
+    eta = format_duration((total - done) / rate) if rate > 0 else "?"
+    return f"{done}/{total} pairs, {rate:.2f} pairs/s, ETA {eta}"
+
+async def review_pairs(pairs: List[Tuple[str, str]],
+                       texts: Dict[str, str],
+                       concurrency: int) -> AsyncIterator[Dict[str, Any]]:
+    """Review (resume path, job description path) pairs, yielding a record for each as it finishes"""
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    graph = get_graph()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    # Profile each job description once for all the resumes it is paired with
+    profiles = {}
+    if job_profile_enabled():
+        async def profile(jd_path: str):
+            async with semaphore:
+                profiles[jd_path] = await aget_job_profile(texts[jd_path])
+        await asyncio.gather(*[profile(jd_path) for jd_path in sorted({jd_path for _, jd_path in pairs})])
+
+    async def review(resume_path: str, jd_path: str) -> Dict[str, Any]:
+        record = {
+            "key": pair_key(resume_path, jd_path, texts[resume_path], texts[jd_path]),
+            "resume": resume_path,
+            "job_description": jd_path,
+        }
+        # Logs for a pair carry the start of its key, which is also in the output
+        with correlation_scope(record["key"][:16]):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    result = await graph.ainvoke({
+                        "resume": texts[resume_path],
+                        "job_description": texts[jd_path],
+                        "job_profile": profiles.get(jd_path)
+                    })
+                    if result.get("match_analysis") is None:
+                        record.update(status="error", error="Could not extract experience, education and skills from the resume")
+                    else:
+                        record.update(status="ok", **summarize_result(result))
+                except Exception as e:
+                    logger.error(f"Error reviewing {resume_path} against {jd_path}: {str(e)}")
+                    record.update(status="error", error=str(e))
+                record["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+        return record
+
+    tasks = [asyncio.create_task(review(resume_path, jd_path)) for resume_path, jd_path in pairs]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        # Stop outstanding reviews if the caller goes away
+        for task in tasks:
+            task.cancel()
+
+def get_batch_concurrency() -> int:
+    """Get the default number of pairs reviewed at once"""
+    return int(os.getenv("BATCH_CONCURRENCY", "4"))
@@ -0,0 +1,196 @@
+"""Content-addressed cache for extraction results"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+def normalize_text(text: str) -> str:
+    """Normalize text so formatting-only differences map to the same cache key"""
+    text = unicodedata.normalize("NFKC", text or "")
+    return " ".join(text.split())
+
+def content_hash(*parts: str) -> str:
+    """Hash one or more normalized texts into a cache key"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(normalize_text(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+def open_database(path: str) -> sqlite3.Connection:
+    """Open a SQLite database that several processes can read and write at once"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    # WAL lets readers run alongside a writer; writers wait up to the timeout for each other
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+class ExtractionCache:
+    """Two-tier cache: an in-memory LRU in front of an optional SQLite store
+
+    The SQLite store is shared by every process using the same path, so API
+    workers reuse each other's extractions. Expired and excess entries are
+    evicted every evict_interval writes, so the store can briefly hold a few
+    more than disk_size. Every call blocks, so async code runs it in a thread.
+    """
+    
+    def __init__(self, path: Optional[str] = None, memory_size: int = 1024,
+                 disk_size: int = 100000, ttl: Optional[float] = None, evict_interval: int = 100):
+        self.path = path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.ttl = ttl
+        self.evict_interval = max(1, evict_interval)
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._conn = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        
+        if path:
+            self._conn = open_database(path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " kind TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (kind, key))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            self._conn.commit()
+    
+    def _expired(self, created_at: float, now: float) -> bool:
+        """Check whether an entry has outlived the TTL"""
+        return self.ttl is not None and now - created_at > self.ttl
+    
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        """Get a cached value, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get((kind, key))
+            if entry is not None:
+                value, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end((kind, key))
+                    self.stats["memory_hits"] += 1
+                    return value
+                del self._memory[(kind, key)]
+            
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM entries WHERE kind = ? AND key = ?",
+                    (kind, key)
+                ).fetchone()
+                if row is not None:
+                    if not self._expired(row[1], now):
+                        value = json.loads(row[0])
+                        self._conn.execute(
+                            "UPDATE entries SET accessed_at = ? WHERE kind = ? AND key = ?",
+                            (now, kind, key)
+                        )
+                        self._conn.commit()
+                        self._remember(kind, key, value, row[1])
+                        self.stats["disk_hits"] += 1
+                        return value
+                    self._conn.execute("DELETE FROM entries WHERE kind = ? AND key = ?", (kind, key))
+                    self._conn.commit()
+            
+            self.stats["misses"] += 1
+            return None
+    
+    def set(self, kind: str, key: str, value: Any):
+        """Store a JSON-serializable value"""
+        now = time.time()
+        with self._lock:
+            self._remember(kind, key, value, now)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (kind, key, value, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (kind, key, json.dumps(value), now, now)
+                )
+                # Counting the rows on every write would scan the table, so evict periodically
+                self._writes += 1
+                if self._writes % self.evict_interval == 0:
+                    self._evict_disk(now)
+                self._conn.commit()
+    
+    def _remember(self, kind: str, key: str, value: Any, created_at: float):
+        """Put a value in the in-memory LRU tier"""
+        if self.memory_size <= 0:
+            return
+        self._memory[(kind, key)] = (value, created_at)
+        self._memory.move_to_end((kind, key))
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+    
+    def _evict_disk(self, now: float):
+        """Drop expired entries and trim the SQLite tier to its size limit"""
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl,))
+        count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        if count > self.disk_size:
+            self._conn.execute(
+                "DELETE FROM entries WHERE rowid IN"
+                " (SELECT rowid FROM entries ORDER BY accessed_at LIMIT ?)",
+                (count - self.disk_size,)
+            )
+            self.stats["evictions"] += count - self.disk_size
+    
+    def get_models(self, kind: str, key: str, model) -> Optional[List[Any]]:
+        """Get a cached list of pydantic models, or None on a miss"""
+        value = self.get(kind, key)
+        if value is None:
+            return None
+        return [model(**item) for item in value]
+    
+    def set_models(self, kind: str, key: str, items: List[Any]):
+        """Store a list of pydantic models"""
+        self.set(kind, key, [item.model_dump() for item in items])
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the hit rate"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+    
+    def clear(self):
+        """Remove every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM entries")
+                self._conn.commit()
+    
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def create_extraction_cache() -> ExtractionCache:
+    """Create the extraction cache from environment variables"""
+    enabled = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+    ttl = os.getenv("EXTRACTION_CACHE_TTL_SECONDS", "604800")
+    return ExtractionCache(
+        path=os.getenv("EXTRACTION_CACHE_PATH", ".cache/extractions.db") if enabled else None,
+        memory_size=int(os.getenv("EXTRACTION_CACHE_MEMORY_SIZE", "1024")) if enabled else 0,
+        disk_size=int(os.getenv("EXTRACTION_CACHE_DISK_SIZE", "100000")),
+        ttl=float(ttl) if ttl else None,
+        evict_interval=int(os.getenv("EXTRACTION_CACHE_EVICT_INTERVAL", "100")),
+    )
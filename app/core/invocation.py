@@ -0,0 +1,605 @@
+"""Single entry point for agents' model calls, with deadlines, retries, hedging and a circuit breaker"""
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional, Sequence
+from app.core.limits import ProviderLimiter, create_provider_limiter
+from app.core.metrics import (
+    AGENT_LATENCY, MODEL_ERRORS, MODEL_ESCALATIONS, MODEL_RETRIES, MODEL_HEDGES, PROVIDER_WAIT, record_usage,
+    registry as metrics_registry, snapshot, Gauge
+)
+from app.utils.logger import setup_logging
+
+# Set up logger
+logger = setup_logging()
+
+# Provider errors worth another attempt, resolved on first use; everything
+# else fails straight away
+_retryable_errors = None
+
+class ModelUnavailableError(RuntimeError):
+    """The model could not be reached within the retry policy, or its circuit is open"""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class ModelOutputError(ValueError):
+    """The model answered, but its response could not be used"""
+
+def get_retryable_errors() -> tuple:
+    """Get the exception types worth retrying"""
+    global _retryable_errors
+    if _retryable_errors is None:
+        import openai
+        _retryable_errors = (
+            openai.APITimeoutError,
+            openai.APIConnectionError,
+            openai.RateLimitError,
+            openai.InternalServerError,
+            TimeoutError,
+        )
+    return _retryable_errors
+
+def is_retryable(error: BaseException) -> bool:
+    """Check whether a failed call is worth retrying"""
+    if isinstance(error, get_retryable_errors()):
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and (status in (408, 409, 429) or status >= 500)
+
+def rate_limit_pause(error: BaseException) -> Optional[float]:
+    """Get how long the provider asked callers to back off, or None if it was not a rate limit"""
+    if getattr(error, "status_code", None) != 429:
+        return None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 1))
+    except ValueError:
+        return 1.0
+
+class InvocationPolicy:
+    """Deadline, retry and hedging settings for model calls"""
+
+    def __init__(self,
+                 timeout: float,
+                 deadline: float,
+                 max_retries: int,
+                 backoff_base: float,
+                 backoff_max: float,
+                 hedge_enabled: bool,
+                 hedge_quantile: float,
+                 hedge_min_samples: int,
+                 hedge_min_delay: float):
+        if not 0 < hedge_quantile < 1:
+            raise ValueError("hedge_quantile must be between 0 and 1")
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_enabled = hedge_enabled
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+
+    def backoff(self, attempt: int) -> float:
+        """Get the delay before a retry, with full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+def create_invocation_policy() -> InvocationPolicy:
+    """Create the invocation policy from environment variables"""
+    return InvocationPolicy(
+        timeout=float(os.getenv("MODEL_TIMEOUT_SECONDS", "60")),
+        deadline=float(os.getenv("MODEL_DEADLINE_SECONDS", "180")),
+        max_retries=int(os.getenv("MODEL_MAX_RETRIES", "2")),
+        backoff_base=float(os.getenv("MODEL_RETRY_BACKOFF_SECONDS", "0.5")),
+        backoff_max=float(os.getenv("MODEL_RETRY_BACKOFF_MAX_SECONDS", "8")),
+        hedge_enabled=os.getenv("MODEL_HEDGE_ENABLED", "false").lower() == "true",
+        hedge_quantile=float(os.getenv("MODEL_HEDGE_QUANTILE", "0.95")),
+        hedge_min_samples=int(os.getenv("MODEL_HEDGE_MIN_SAMPLES", "20")),
+        hedge_min_delay=float(os.getenv("MODEL_HEDGE_MIN_DELAY_SECONDS", "1")),
+    )
+
+class CircuitBreaker:
+    """Stops calling a model after repeated provider failures until it has had time to recover
+
+    After failure_threshold consecutive retryable failures the circuit opens and
+    calls fail immediately. Once reset_timeout has passed one trial call is let
+    through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Get the circuit state: closed, open or half_open"""
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self, name: str) -> bool:
+        """Raise straight away if the circuit does not allow a call now; return True for the half-open trial call"""
+        if self.failure_threshold <= 0:
+            return False
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return False
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            retry_after = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        raise ModelUnavailableError(f"Circuit open for model {name}", retry_after=retry_after)
+
+    def record_success(self):
+        """Close the circuit after a successful call"""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        """Count a provider failure, opening the circuit at the threshold"""
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold > 0:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+    def release_trial(self):
+        """Let another call try the half-open circuit after a trial ended without an outcome, such as by cancellation"""
+        with self._lock:
+            self._trial_running = False
+
+class LatencyTracker:
+    """Recent successful call latencies per agent, for choosing the hedge delay"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, agent: str, seconds: float):
+        """Record one successful call"""
+        with self._lock:
+            self._samples.setdefault(agent, deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, agent: str, q: float, min_samples: int) -> Optional[float]:
+        """Get a latency quantile, or None until there are enough samples"""
+        with self._lock:
+            samples = sorted(self._samples.get(agent, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+# Shared invocation state for the process
+_lock = threading.Lock()
+_policy = None
+_breakers = {}
+_latencies = LatencyTracker()
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="model-call")
+_limiter = None
+_limiter_loaded = False
+
+def get_invocation_policy() -> InvocationPolicy:
+    """Get the shared invocation policy"""
+    global _policy
+    with _lock:
+        if _policy is None:
+            _policy = create_invocation_policy()
+        return _policy
+
+def model_key(model) -> str:
+    """Get the name a model's circuit breaker is kept under"""
+    return getattr(model, "model_name", None) or type(model).__name__
+
+def get_circuit_breaker(model) -> CircuitBreaker:
+    """Get the circuit breaker for a model"""
+    key = model_key(model)
+    with _lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(
+                failure_threshold=int(os.getenv("CIRCUIT_BREAKER_FAILURES", "5")),
+                reset_timeout=float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", "30")),
+            )
+        return _breakers[key]
+
+def get_provider_limiter() -> Optional[ProviderLimiter]:
+    """Get the provider limiter shared with other processes, or None when no limit is set"""
+    global _limiter, _limiter_loaded
+    with _lock:
+        if not _limiter_loaded:
+            _limiter = create_provider_limiter()
+            _limiter_loaded = True
+        return _limiter
+
+def reset_invocation_state():
+    """Drop the policy, circuit breakers, limiter and latency history so they follow the current configuration"""
+    global _policy, _latencies, _limiter, _limiter_loaded
+    with _lock:
+        _policy = None
+        _breakers.clear()
+        _latencies = LatencyTracker()
+        if _limiter is not None:
+            _limiter.close()
+        _limiter = None
+        _limiter_loaded = False
+
+def _prompt_tokens(limiter: ProviderLimiter, prompt) -> int:
+    """Estimate a prompt's size for the token budget, counting only when one is set"""
+    if not limiter.tokens_per_minute:
+        return 0
+    from app.core.prompting import count_tokens
+    return count_tokens(prompt if isinstance(prompt, str) else str(prompt))
+
+def _capacity_error(agent: str, limiter: ProviderLimiter) -> ModelUnavailableError:
+    """Build the error raised when no provider capacity frees up before the deadline"""
+    MODEL_ERRORS.inc(agent=agent)
+    return ModelUnavailableError(
+        f"No provider capacity for {agent} within its deadline",
+        retry_after=limiter.poll_interval
+    )
+
+def _acquire(limiter: Optional[ProviderLimiter], prompt, agent: str, timeout: float) -> Optional[str]:
+    """Wait for a provider slot and budget shared with the other processes"""
+    if limiter is None:
+        return None
+    with PROVIDER_WAIT.time(agent=agent):
+        lease = limiter.acquire(_prompt_tokens(limiter, prompt), timeout)
+    if lease is None:
+        raise _capacity_error(agent, limiter)
+    return lease
+
+async def _aacquire(limiter: Optional[ProviderLimiter], prompt, agent: str, timeout: float) -> Optional[str]:
+    """Wait for a provider slot and budget without blocking the event loop"""
+    if limiter is None:
+        return None
+    with PROVIDER_WAIT.time(agent=agent):
+        lease = await limiter.aacquire(_prompt_tokens(limiter, prompt), timeout)
+    if lease is None:
+        raise _capacity_error(agent, limiter)
+    return lease
+
+def _try_hedge_lease(limiter: Optional[ProviderLimiter], prompt, agent: str) -> Optional[str]:
+    """Take a provider slot for a duplicate request, or return "" when the limits leave no room"""
+    if limiter is None:
+        return None
+    lease, _ = limiter.try_acquire(_prompt_tokens(limiter, prompt))
+    if lease is None:
+        MODEL_HEDGES.inc(agent=agent, result="no_capacity")
+        return ""
+    return lease
+
+async def _atry_hedge_lease(limiter: Optional[ProviderLimiter], prompt, agent: str) -> Optional[str]:
+    """Take a provider slot for a duplicate request without blocking the event loop"""
+    if limiter is None:
+        return None
+    lease, _ = await asyncio.to_thread(limiter.try_acquire, _prompt_tokens(limiter, prompt))
+    if lease is None:
+        MODEL_HEDGES.inc(agent=agent, result="no_capacity")
+        return ""
+    return lease
+
+def _check_circuit(breaker: CircuitBreaker, model, limiter: Optional[ProviderLimiter], lease: Optional[str]) -> bool:
+    """Fail fast on an open circuit, giving back the provider slot the call would have used"""
+    try:
+        return breaker.before_call(model_key(model))
+    except ModelUnavailableError:
+        if limiter is not None:
+            limiter.release(lease)
+        raise
+
+async def _acheck_circuit(breaker: CircuitBreaker, model, limiter: Optional[ProviderLimiter], lease: Optional[str]) -> bool:
+    """Fail fast on an open circuit, giving back the provider slot without blocking the event loop"""
+    try:
+        return breaker.before_call(model_key(model))
+    except ModelUnavailableError:
+        if limiter is not None:
+            await asyncio.to_thread(limiter.release, lease)
+        raise
+
+def _pause_on_rate_limit(limiter: Optional[ProviderLimiter], error: BaseException, delay: float):
+    """Hold back every process's calls after the provider's rate limit was hit"""
+    pause = rate_limit_pause(error)
+    if limiter is not None and pause is not None:
+        limiter.pause(max(pause, delay))
+
+async def _apause_on_rate_limit(limiter: Optional[ProviderLimiter], error: BaseException, delay: float):
+    """Hold back every process's calls after a rate limit without blocking the event loop"""
+    pause = rate_limit_pause(error)
+    if limiter is not None and pause is not None:
+        await asyncio.to_thread(limiter.pause, max(pause, delay))
+
+def _call(model, prompt, limiter: Optional[ProviderLimiter], lease: Optional[str]):
+    """Invoke the model in a pool thread, giving back its provider slot when the call ends"""
+    try:
+        return model.invoke(prompt)
+    finally:
+        if limiter is not None:
+            limiter.release(lease)
+
+async def _acall(model, prompt, limiter: Optional[ProviderLimiter], lease: Optional[str]):
+    """Invoke the model asynchronously, giving back its provider slot when the call ends"""
+    try:
+        return await model.ainvoke(prompt)
+    finally:
+        if limiter is not None:
+            # The release finishes in its thread even if this task is cancelled meanwhile
+            await asyncio.to_thread(limiter.release, lease)
+
+def _hedge_delay(policy: InvocationPolicy, agent: str) -> Optional[float]:
+    """Get how long to wait before sending a duplicate request, or None to not hedge"""
+    if not policy.hedge_enabled:
+        return None
+    quantile = _latencies.quantile(agent, policy.hedge_quantile, policy.hedge_min_samples)
+    if quantile is None:
+        return None
+    return max(policy.hedge_min_delay, quantile)
+
+def _attempt(model, prompt: str, agent: str, timeout: float, hedge_delay: Optional[float],
+             limiter: Optional[ProviderLimiter] = None, lease: Optional[str] = None):
+    """Make one call, duplicating it after hedge_delay, and return the first success
+
+    The call's provider slot is given back when it finishes, even if it
+    finishes after the attempt timed out.
+    """
+    # Calls run in the pool so the deadline holds even if the client hangs
+    primary = _executor.submit(contextvars.copy_context().run, _call, model, prompt, limiter, lease)
+    futures = {primary}
+    start = time.monotonic()
+    if hedge_delay is not None and hedge_delay < timeout:
+        done, _ = wait(futures, timeout=hedge_delay)
+        hedge_lease = None if done else _try_hedge_lease(limiter, prompt, agent)
+        if not done and hedge_lease != "":
+            MODEL_HEDGES.inc(agent=agent, result="sent")
+            futures.add(_executor.submit(
+                contextvars.copy_context().run, _call, model, prompt, limiter, hedge_lease
+            ))
+
+    error = None
+    while futures:
+        remaining = timeout - (time.monotonic() - start)
+        done, futures = wait(futures, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            if future.exception() is None:
+                if future is not primary:
+                    MODEL_HEDGES.inc(agent=agent, result="won")
+                # A request already sent cannot be stopped; its result is dropped
+                for other in futures:
+                    other.cancel()
+                return future.result()
+            error = future.exception()
+    if error is not None:
+        raise error
+    raise TimeoutError(f"Model call for {agent} exceeded {timeout:.1f}s")
+
+async def _aattempt(model, prompt: str, agent: str, timeout: float, hedge_delay: Optional[float],
+                    limiter: Optional[ProviderLimiter] = None, lease: Optional[str] = None):
+    """Make one async call, duplicating it after hedge_delay, and return the first success"""
+    tasks = {asyncio.ensure_future(_acall(model, prompt, limiter, lease))}
+    primary = next(iter(tasks))
+    start = time.monotonic()
+    try:
+        if hedge_delay is not None and hedge_delay < timeout:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            hedge_lease = None if done else await _atry_hedge_lease(limiter, prompt, agent)
+            if not done and hedge_lease != "":
+                MODEL_HEDGES.inc(agent=agent, result="sent")
+                tasks.add(asyncio.ensure_future(_acall(model, prompt, limiter, hedge_lease)))
+
+        error = None
+        while tasks:
+            remaining = timeout - (time.monotonic() - start)
+            done, tasks = await asyncio.wait(tasks, timeout=max(0.0, remaining), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        MODEL_HEDGES.inc(agent=agent, result="won")
+                    return task.result()
+                error = task.exception()
+        if error is not None:
+            raise error
+        raise TimeoutError(f"Model call for {agent} exceeded {timeout:.1f}s")
+    finally:
+        # Cancel the losing or timed-out requests
+        for task in tasks:
+            task.cancel()
+
+def _log_call(model, agent: str, start: float, retries: int):
+    """Log a finished model call at debug level"""
+    logger.debug(f"Called {model_key(model)} for {agent}", extra={
+        "agent": agent,
+        "model": model_key(model),
+        "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+        "retries": retries,
+    })
+
+def _give_up(agent: str, error: BaseException, attempts: int) -> ModelUnavailableError:
+    """Build the error raised once the retry policy is exhausted"""
+    MODEL_ERRORS.inc(agent=agent)
+    return ModelUnavailableError(f"Model call for {agent} failed after {attempts} attempt(s): {error}")
+
+def invoke_model(model, prompt: str, agent: str):
+    """Call the model under the invocation policy, recording latency, token usage and errors"""
+    policy = get_invocation_policy()
+    breaker = get_circuit_breaker(model)
+    limiter = get_provider_limiter()
+    start = time.perf_counter()
+    attempt = 0
+    try:
+        while True:
+            lease = _acquire(limiter, prompt, agent, policy.deadline - (time.perf_counter() - start))
+            trial = _check_circuit(breaker, model, limiter, lease)
+            remaining = policy.deadline - (time.perf_counter() - start)
+            attempt_start = time.perf_counter()
+            try:
+                response = _attempt(
+                    model, prompt, agent, min(policy.timeout, remaining), _hedge_delay(policy, agent),
+                    limiter, lease
+                )
+            except Exception as e:
+                if not is_retryable(e):
+                    # The provider answered, so the circuit stays healthy
+                    breaker.record_success()
+                    MODEL_ERRORS.inc(agent=agent)
+                    raise
+                breaker.record_failure()
+                delay = policy.backoff(attempt)
+                _pause_on_rate_limit(limiter, e, delay)
+                attempt += 1
+                if attempt > policy.max_retries or time.perf_counter() - start + delay >= policy.deadline:
+                    raise _give_up(agent, e, attempt) from e
+                MODEL_RETRIES.inc(agent=agent)
+                logger.warning(f"Retrying {agent} in {delay:.2f}s after: {e}")
+                time.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled or interrupted before an outcome, so free the half-open trial for the next call
+                if trial:
+                    breaker.release_trial()
+                raise
+            breaker.record_success()
+            _latencies.record(agent, time.perf_counter() - attempt_start)
+            break
+    finally:
+        AGENT_LATENCY.observe(time.perf_counter() - start, agent=agent)
+    record_usage(agent, response)
+    _log_call(model, agent, start, attempt)
+    return response
+
+async def ainvoke_model(model, prompt: str, agent: str):
+    """Call the model asynchronously under the invocation policy, recording latency, token usage and errors"""
+    policy = get_invocation_policy()
+    breaker = get_circuit_breaker(model)
+    limiter = get_provider_limiter()
+    start = time.perf_counter()
+    attempt = 0
+    try:
+        while True:
+            lease = await _aacquire(limiter, prompt, agent, policy.deadline - (time.perf_counter() - start))
+            trial = await _acheck_circuit(breaker, model, limiter, lease)
+            remaining = policy.deadline - (time.perf_counter() - start)
+            attempt_start = time.perf_counter()
+            try:
+                response = await _aattempt(
+                    model, prompt, agent, min(policy.timeout, remaining), _hedge_delay(policy, agent),
+                    limiter, lease
+                )
+            except Exception as e:
+                if not is_retryable(e):
+                    # The provider answered, so the circuit stays healthy
+                    breaker.record_success()
+                    MODEL_ERRORS.inc(agent=agent)
+                    raise
+                breaker.record_failure()
+                delay = policy.backoff(attempt)
+                await _apause_on_rate_limit(limiter, e, delay)
+                attempt += 1
+                if attempt > policy.max_retries or time.perf_counter() - start + delay >= policy.deadline:
+                    raise _give_up(agent, e, attempt) from e
+                MODEL_RETRIES.inc(agent=agent)
+                logger.warning(f"Retrying {agent} in {delay:.2f}s after: {e}")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled or interrupted before an outcome, so free the half-open trial for the next call
+                if trial:
+                    breaker.release_trial()
+                raise
+            breaker.record_success()
+            _latencies.record(agent, time.perf_counter() - attempt_start)
+            break
+    finally:
+        AGENT_LATENCY.observe(time.perf_counter() - start, agent=agent)
+    record_usage(agent, response)
+    _log_call(model, agent, start, attempt)
+    return response
+
+def _escalate(agent: str, model, error: BaseException):
+    """Record a call moving on to the next model in the agent's chain"""
+    reason = "invalid_output" if isinstance(error, ModelOutputError) else "unavailable"
+    MODEL_ESCALATIONS.inc(agent=agent, model=model_key(model), reason=reason)
+    logger.warning(f"Escalating {agent} from {model_key(model)} after: {error}")
+
+def invoke_chain(models: Sequence[Any], prompt: str, agent: str, parse: Callable[[str, bool], Any]):
+    """Call an agent's models in turn until one gives a usable response
+
+    parse(text, last) turns a response into the agent's result, raising
+    ModelOutputError when it fails validation; last is True for the final
+    model, whose output the agent may accept with invalid parts dropped. A
+    model that is unavailable also hands the call to the next one.
+    """
+    for index, model in enumerate(models):
+        last = index == len(models) - 1
+        try:
+            response = invoke_model(model, prompt, agent)
+            return parse(response.content, last)
+        except (ModelOutputError, ModelUnavailableError) as e:
+            if last:
+                raise
+            _escalate(agent, model, e)
+
+async def ainvoke_chain(models: Sequence[Any], prompt: str, agent: str, parse: Callable[[str, bool], Any]):
+    """Call an agent's models in turn asynchronously until one gives a usable response"""
+    for index, model in enumerate(models):
+        last = index == len(models) - 1
+        try:
+            response = await ainvoke_model(model, prompt, agent)
+            return parse(response.content, last)
+        except (ModelOutputError, ModelUnavailableError) as e:
+            if last:
+                raise
+            _escalate(agent, model, e)
+
+def collect_breaker_metrics():
+    """Report each model's circuit state at scrape time"""
+    with _lock:
+        breakers = dict(_breakers)
+    states = ("closed", "half_open", "open")
+    samples = {}
+    for key, breaker in breakers.items():
+        current = breaker.state
+        for state in states:
+            samples[(key, state)] = 1 if state == current else 0
+    return [snapshot(
+        Gauge, "resume_reviewer_circuit_state",
+        "Circuit breaker state per model (1 for the current state)", ["model", "state"], samples
+    )]
+
+def collect_limiter_metrics():
+    """Report the provider slots and per-minute budgets left across all processes"""
+    with _lock:
+        limiter = _limiter
+    if limiter is None:
+        return []
+    usage = limiter.get_usage()
+    return [snapshot(
+        Gauge, "resume_reviewer_provider_capacity",
+        "Provider slots in use and per-minute request and token budgets left, shared by all processes",
+        ["resource"], {(resource,): value for resource, value in usage.items()}
+    )]
+
+metrics_registry.add_collector(collect_breaker_metrics)
+metrics_registry.add_collector(collect_limiter_metrics)
@@ -0,0 +1,321 @@
+"""Durable SQLite-backed queue of review jobs and the worker pool that runs them"""
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.core.cache import content_hash, open_database
+from app.utils.logger import correlation_scope, setup_logging
+
+# Set up logger
+logger = setup_logging()
+
+# Job states: queued -> running -> done | failed; a running job whose lease
+# expires (its worker crashed or was stopped) is picked up again
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+class JobFailed(Exception):
+    """A job failed in a way that retrying cannot fix"""
+
+class JobQueue:
+    """Persistent queue of review jobs, deduplicated by resume and job description
+
+    Every API process opens the same database, so jobs submitted to one
+    worker process can be claimed by any of them.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3, lease_seconds: float = 300,
+                 retention_seconds: Optional[float] = None):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._conn = open_database(path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " dedup_key TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " resume TEXT NOT NULL,"
+            " job_description TEXT NOT NULL,"
+            " result TEXT,"
+            " error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " available_at REAL NOT NULL,"
+            " lease_until REAL,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        # Only one live or finished job per (resume, job description); failed ones can be resubmitted
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS jobs_dedup ON jobs (dedup_key) WHERE status != 'failed'"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, available_at)")
+        self._conn.commit()
+
+    def submit(self, resume: str, job_description: str) -> Dict[str, Any]:
+        """Queue a review, or return the existing job for the same resume and job description"""
+        dedup_key = f"{content_hash(resume)}:{content_hash(job_description)}"
+        now = time.time()
+        with self._lock:
+            # Take the write lock first so another process cannot insert the same job in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE dedup_key = ? AND status != 'failed'", (dedup_key,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.commit()
+                    return {**self._to_dict(row), "deduplicated": True}
+
+                job_id = uuid.uuid4().hex
+                self._conn.execute(
+                    "INSERT INTO jobs (id, dedup_key, status, resume, job_description, available_at, created_at, updated_at)"
+                    " VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                    (job_id, dedup_key, resume, job_description, now, now, now)
+                )
+                self._conn.commit()
+            except BaseException:
+                # Leave no transaction open to hold the write lock for every other process
+                self._conn.rollback()
+                raise
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return {**self._to_dict(row), "deduplicated": False}
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job's status and result, or None if it does not exist"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Lease the oldest runnable job, including running jobs whose lease has expired"""
+        now = time.time()
+        with self._lock:
+            # Take the write lock first so workers in other processes cannot claim the same job
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose worker died too many times are given up on
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', updated_at = ?,"
+                    " error = COALESCE(error, 'Worker stopped while running the job')"
+                    " WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                    (now, now, self.max_attempts)
+                )
+                row = self._conn.execute(
+                    "SELECT * FROM jobs"
+                    " WHERE (status = 'queued' AND available_at <= ?)"
+                    " OR (status = 'running' AND lease_until < ?)"
+                    " ORDER BY created_at LIMIT 1",
+                    (now, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.commit()
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?, updated_at = ?"
+                    " WHERE id = ?",
+                    (now + self.lease_seconds, now, row["id"])
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        job = self._to_dict(row)
+        job["resume"] = row["resume"]
+        job["job_description"] = row["job_description"]
+        return job
+
+    def heartbeat(self, job_id: str):
+        """Extend the lease of a running job"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running'",
+                (now + self.lease_seconds, job_id)
+            )
+            self._conn.commit()
+
+    def complete(self, job_id: str, result: Dict[str, Any]):
+        """Store a job's result"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_until = NULL, updated_at = ?"
+                " WHERE id = ?",
+                (json.dumps(result), now, job_id)
+            )
+            self._conn.commit()
+
+    def fail(self, job_id: str, error: str, retry: bool = True):
+        """Record a failed attempt, requeueing the job with backoff while attempts remain"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            if retry and row["attempts"] < self.max_attempts:
+                delay = random.uniform(0, min(60.0, 2.0 ** row["attempts"]))
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, available_at = ?, lease_until = NULL, updated_at = ?"
+                    " WHERE id = ?",
+                    (error, now + delay, now, job_id)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                    (error, now, job_id)
+                )
+            self._conn.commit()
+
+    def release(self, job_id: str):
+        """Put a running job back in the queue without counting the attempt, e.g. on shutdown"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), available_at = ?,"
+                " lease_until = NULL, updated_at = ? WHERE id = ? AND status = 'running'",
+                (now, now, job_id)
+            )
+            self._conn.commit()
+
+    def purge(self):
+        """Delete finished jobs older than the retention period"""
+        if self.retention_seconds is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (time.time() - self.retention_seconds,)
+            )
+            self._conn.commit()
+
+    def get_counts(self) -> Dict[str, int]:
+        """Count jobs by status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update({row[0]: row[1] for row in rows})
+        return counts
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            self._conn.close()
+
+    def _to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a job row to its public form, without the submitted texts"""
+        return {
+            "id": row["id"],
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+        }
+
+class JobWorkerPool:
+    """Async workers that claim jobs from the queue and run them through a handler"""
+
+    def __init__(self, queue: JobQueue, handler: Callable[[str, str], Awaitable[Dict[str, Any]]],
+                 workers: int, poll_interval: float = 1.0):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks = []
+        self._wakeup = None
+
+    def start(self):
+        """Start the workers on the running event loop"""
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"review-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} review workers")
+
+    def notify(self):
+        """Wake idle workers after a job is submitted"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self):
+        """Stop the workers; jobs they were running go back to the queue"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self):
+        """Claim and run jobs until cancelled"""
+        while True:
+            try:
+                job = await asyncio.to_thread(self.queue.claim)
+            except Exception as e:
+                # A locked or unreadable database must not kill the worker; try again after a pause
+                logger.error(f"Could not claim a review job: {str(e)}")
+                await asyncio.sleep(self.poll_interval * random.uniform(1.0, 2.0))
+                continue
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]):
+        """Run one job, keeping its lease alive and recording the outcome"""
+        job_id = job["id"]
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            # The job ID ties the review's logs together across attempts
+            with correlation_scope(job_id):
+                result = await self.handler(job["resume"], job["job_description"])
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self.queue.release, job_id)
+            raise
+        except JobFailed as e:
+            logger.error(f"Review job {job_id} failed: {str(e)}")
+            await asyncio.to_thread(self.queue.fail, job_id, str(e), False)
+        except Exception as e:
+            logger.error(f"Review job {job_id} attempt {job['attempts']} failed: {str(e)}")
+            await asyncio.to_thread(self.queue.fail, job_id, str(e))
+        else:
+            await asyncio.to_thread(self.queue.complete, job_id, result)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: str):
+        """Renew a job's lease until cancelled"""
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            await asyncio.to_thread(self.queue.heartbeat, job_id)
+
+def create_job_queue() -> JobQueue:
+    """Create the job queue from environment variables"""
+    retention = os.getenv("JOB_RETENTION_SECONDS", "604800")
+    return JobQueue(
+        path=os.getenv("JOB_QUEUE_PATH", ".cache/jobs.db"),
+        max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+        lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "300")),
+        retention_seconds=float(retention) if retention else None,
+    )
+
+def get_job_workers() -> int:
+    """Get the number of review workers to run in the API process"""
+    return int(os.getenv("JOB_WORKERS", "2"))
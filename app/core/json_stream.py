@@ -0,0 +1,184 @@
+"""Incremental parsing of JSON objects from model responses"""
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, List
+
+# Characters that can change the parser state
+STRUCTURAL = re.compile(r'[{}"\\]')
+
+# Trailing commas are the most common way models break otherwise valid JSON
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+DECODER = json.JSONDecoder()
+
+class IncrementalJSONParser:
+    """Pull complete top-level JSON objects out of text as it arrives
+
+    Text outside objects (prose, code fences, the brackets of a surrounding
+    array) is skipped, so each object is returned as soon as its closing brace
+    is seen. An object left open when the text ends is dropped, and an object
+    that does not decode is counted in errors and skipped.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped_index = None
+        self.errors = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of text and return the objects it completes"""
+        objects = []
+        start = 0
+        # Only braces, quotes and backslashes change state, so jump between them
+        for match in STRUCTURAL.finditer(chunk):
+            index = match.start()
+            char = match.group()
+            if self._depth == 0:
+                # Outside any object: wait for the next one to open
+                if char == "{":
+                    self._parts = []
+                    start = index
+                    self._depth = 1
+                continue
+
+            if index == self._escaped_index:
+                continue
+            if self._in_string:
+                if char == "\\":
+                    self._escaped_index = index + 1
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[start:index + 1])
+                    obj = self._decode("".join(self._parts))
+                    self._parts = []
+                    if obj is not None:
+                        objects.append(obj)
+
+        if self._depth > 0:
+            self._parts.append(chunk[start:])
+        # An escape on the last character applies to the first one of the next chunk
+        if self._escaped_index is not None:
+            self._escaped_index = self._escaped_index - len(chunk) if self._escaped_index >= len(chunk) else None
+        return objects
+
+    def _decode(self, text: str):
+        """Decode one object, repairing trailing commas if needed"""
+        obj = _repair(text)
+        if obj is None:
+            self.errors += 1
+        return obj
+
+def _repair(text: str):
+    """Decode one object, repairing trailing commas if needed, or return None"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(TRAILING_COMMA.sub(r"\1", text))
+    except json.JSONDecodeError:
+        return None
+
+def _closing_brace(text: str, start: int) -> int:
+    """Find the brace closing the object opened at start, or -1 if the text ends first"""
+    depth = 0
+    in_string = False
+    escaped_index = None
+    for match in STRUCTURAL.finditer(text, start):
+        index = match.start()
+        char = match.group()
+        if index == escaped_index:
+            continue
+        if in_string:
+            if char == "\\":
+                escaped_index = index + 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return index
+    return -1
+
+def iter_text_objects(text: str) -> Iterator[Dict[str, Any]]:
+    """Yield top-level JSON objects from a complete text
+
+    Well-formed objects are decoded directly and ones with trailing commas are
+    repaired. An object that still does not decode is skipped; a brace that is
+    never closed, from stray prose or a truncated response, is passed over so
+    the objects after or inside it are still found.
+    """
+    index = text.find("{")
+    while index != -1:
+        try:
+            obj, end = DECODER.raw_decode(text, index)
+        except json.JSONDecodeError:
+            close = _closing_brace(text, index)
+            if close == -1:
+                index = text.find("{", index + 1)
+                continue
+            obj, end = _repair(text[index:close + 1]), close + 1
+        if isinstance(obj, dict):
+            yield obj
+        index = text.find("{", end)
+
+def iter_json_objects(chunks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Yield top-level JSON objects from a stream of text chunks"""
+    parser = IncrementalJSONParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+
+def _candidates(obj: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Unwrap objects like {"items": [...]} into the items they hold"""
+    for value in obj.values():
+        if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+            return value
+    return [obj]
+
+def _validate(obj: Dict[str, Any], item_model, on_error=None) -> list:
+    """Validate an object, or the items it wraps, against a pydantic model"""
+    try:
+        return [item_model(**obj)]
+    except Exception as e:
+        candidates = _candidates(obj)
+        if candidates == [obj]:
+            if on_error is not None:
+                on_error(e)
+            return []
+    items = []
+    for candidate in candidates:
+        try:
+            items.append(item_model(**candidate))
+        except Exception as e:
+            if on_error is not None:
+                on_error(e)
+    return items
+
+def iter_items(chunks: Iterable[str], item_model, on_error=None) -> Iterator[Any]:
+    """Yield each validated item from a stream of text chunks as soon as it closes"""
+    for obj in iter_json_objects(chunks):
+        yield from _validate(obj, item_model, on_error)
+
+def parse_items(text: str, item_model, on_error=None) -> list:
+    """Parse every valid item from a complete, possibly truncated or malformed, response"""
+    items = []
+    for obj in iter_text_objects(text):
+        items.extend(_validate(obj, item_model, on_error))
+    return items
+
+def parse_first_object(text: str):
+    """Parse the first complete JSON object in a response, or None"""
+    return next(iter_text_objects(text), None)
@@ -0,0 +1,188 @@
+"""Concurrency and rate limits toward the model provider, shared by every process through SQLite"""
+import asyncio
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+from app.core.cache import open_database
+
+class ProviderLimiter:
+    """Caps concurrent calls and per-minute requests and tokens across all processes
+
+    Concurrency is a fixed set of slot rows that a call leases for its duration;
+    a lease left behind by a crashed process expires after lease_seconds. Request
+    and token rates are token buckets refilled continuously, holding up to one
+    minute of budget. A provider rate limit response pauses every process until
+    its retry-after has passed. A limit of 0 is not enforced.
+    """
+
+    def __init__(self, path: str, max_concurrency: int = 0, requests_per_minute: float = 0,
+                 tokens_per_minute: float = 0, lease_seconds: float = 300, poll_interval: float = 0.05):
+        if max_concurrency < 0 or requests_per_minute < 0 or tokens_per_minute < 0:
+            raise ValueError("Provider limits cannot be negative")
+        self.path = path
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+
+        self._conn = open_database(path)
+        # Transactions are started explicitly so each acquisition holds the write lock throughout
+        self._conn.isolation_level = None
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS slots (slot INTEGER PRIMARY KEY, holder TEXT, lease_until REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, level REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pause (id INTEGER PRIMARY KEY CHECK (id = 0), until REAL NOT NULL)"
+        )
+        self._conn.execute("BEGIN IMMEDIATE")
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO slots (slot) VALUES (?)", [(i,) for i in range(max_concurrency)]
+        )
+        self._conn.execute("INSERT OR IGNORE INTO pause (id, until) VALUES (0, 0)")
+        self._conn.execute("COMMIT")
+
+    def try_acquire(self, tokens: int = 0) -> Tuple[Optional[str], float]:
+        """Take a slot and the call's budget if available
+
+        Returns the lease ID, or None and how long to wait before trying again.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                until = self._conn.execute("SELECT until FROM pause WHERE id = 0").fetchone()[0]
+                if until > now:
+                    return None, until - now
+
+                slot = None
+                if self.max_concurrency:
+                    row = self._conn.execute(
+                        "SELECT slot FROM slots WHERE slot < ? AND (holder IS NULL OR lease_until < ?) LIMIT 1",
+                        (self.max_concurrency, now)
+                    ).fetchone()
+                    if row is None:
+                        return None, self.poll_interval
+                    slot = row[0]
+
+                levels = {}
+                for name, rate, cost in (("requests", self.requests_per_minute, 1),
+                                         ("tokens", self.tokens_per_minute, tokens)):
+                    if not rate:
+                        continue
+                    level = self._refill(name, rate, now)
+                    # A call larger than a minute's budget waits for a full bucket instead of forever
+                    cost = min(cost, rate)
+                    if level < cost:
+                        return None, (cost - level) * 60 / rate
+                    levels[name] = level - cost
+
+                for name, level in levels.items():
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO buckets (name, level, updated_at) VALUES (?, ?, ?)",
+                        (name, level, now)
+                    )
+                lease = uuid.uuid4().hex
+                if slot is not None:
+                    self._conn.execute(
+                        "UPDATE slots SET holder = ?, lease_until = ? WHERE slot = ?",
+                        (lease, now + self.lease_seconds, slot)
+                    )
+                return lease, 0.0
+            finally:
+                self._conn.execute("COMMIT")
+
+    def _refill(self, name: str, rate: float, now: float) -> float:
+        """Get a bucket's level after refilling it for the time since it was last used"""
+        row = self._conn.execute("SELECT level, updated_at FROM buckets WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return rate
+        return min(rate, row[0] + (now - row[1]) * rate / 60)
+
+    def acquire(self, tokens: int = 0, timeout: Optional[float] = None) -> Optional[str]:
+        """Wait for a slot and the call's budget, returning the lease ID or None on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            lease, wait = self.try_acquire(tokens)
+            if lease is not None:
+                return lease
+            delay = self._delay(wait, deadline)
+            if delay is None:
+                return None
+            time.sleep(delay)
+
+    async def aacquire(self, tokens: int = 0, timeout: Optional[float] = None) -> Optional[str]:
+        """Wait for a slot and the call's budget without blocking the event loop"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            lease, wait = await asyncio.to_thread(self.try_acquire, tokens)
+            if lease is not None:
+                return lease
+            delay = self._delay(wait, deadline)
+            if delay is None:
+                return None
+            await asyncio.sleep(delay)
+
+    def _delay(self, wait: float, deadline: Optional[float]) -> Optional[float]:
+        """Get how long to sleep before the next try, or None if the deadline has passed"""
+        # Jitter keeps waiting processes from retrying in lockstep
+        delay = wait * random.uniform(1.0, 1.2)
+        if deadline is None:
+            return delay
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        return min(delay, remaining)
+
+    def release(self, lease: Optional[str]):
+        """Give back a slot taken by acquire"""
+        if lease is None or not self.max_concurrency:
+            return
+        with self._lock:
+            self._conn.execute("UPDATE slots SET holder = NULL, lease_until = NULL WHERE holder = ?", (lease,))
+
+    def pause(self, seconds: float):
+        """Hold back new calls from every process, e.g. after the provider's rate limit was hit"""
+        with self._lock:
+            self._conn.execute("UPDATE pause SET until = MAX(until, ?) WHERE id = 0", (time.time() + seconds,))
+
+    def get_usage(self) -> Dict[str, float]:
+        """Get the slots in use and the remaining per-minute budgets"""
+        now = time.time()
+        with self._lock:
+            in_use = self._conn.execute(
+                "SELECT COUNT(*) FROM slots WHERE slot < ? AND holder IS NOT NULL AND lease_until >= ?",
+                (self.max_concurrency, now)
+            ).fetchone()[0]
+            usage = {"slots_in_use": in_use}
+            for name, rate in (("requests", self.requests_per_minute), ("tokens", self.tokens_per_minute)):
+                if rate:
+                    usage[f"{name}_available"] = self._refill(name, rate, now)
+        return usage
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            self._conn.close()
+
+def create_provider_limiter() -> Optional[ProviderLimiter]:
+    """Create the provider limiter from environment variables, or None when no limit is set"""
+    max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    requests_per_minute = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0") or 0)
+    tokens_per_minute = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0") or 0)
+    if not (max_concurrency or requests_per_minute or tokens_per_minute):
+        return None
+    return ProviderLimiter(
+        path=os.getenv("LLM_LIMITS_PATH", ".cache/limits.db"),
+        max_concurrency=max_concurrency,
+        requests_per_minute=requests_per_minute,
+        tokens_per_minute=tokens_per_minute,
+        lease_seconds=float(os.getenv("LLM_SLOT_LEASE_SECONDS", "300")),
+    )
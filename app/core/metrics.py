@@ -0,0 +1,292 @@
+"""In-process metrics in the Prometheus text format"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Latency buckets in seconds, sized for LLM calls
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+def _escape(value: str) -> str:
+    """Escape a label value"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Format a label set such as {node="extract"}"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    """Format a sample value"""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    """Base class for labelled metrics"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Get the label values in label name order"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        """Get the HELP and TYPE lines"""
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        """Increase the count"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        """Render the samples"""
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        """Set the value"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        """Increase the value"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        """Decrease the value"""
+        self.inc(-amount, **labels)
+
+    def collect(self) -> List[str]:
+        """Render the samples"""
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        """Record one observation"""
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self) -> List[str]:
+        """Render the samples"""
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Holds metrics and renders them for a scrape"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric to the registry"""
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[_Metric]]):
+        """Add a callback that builds metrics from live state at scrape time"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        for collector in collectors:
+            metrics.extend(collector())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+# Shared registry for the process
+registry = MetricsRegistry()
+
+NODE_LATENCY = registry.register(Histogram(
+    "resume_reviewer_node_duration_seconds",
+    "Time spent in each workflow node",
+    ["node"]
+))
+AGENT_LATENCY = registry.register(Histogram(
+    "resume_reviewer_agent_duration_seconds",
+    "Time spent in each agent's model call",
+    ["agent"]
+))
+PROMPT_TOKENS = registry.register(Counter(
+    "resume_reviewer_prompt_tokens_total",
+    "Prompt tokens reported by the model provider",
+    ["agent"]
+))
+COMPLETION_TOKENS = registry.register(Counter(
+    "resume_reviewer_completion_tokens_total",
+    "Completion tokens reported by the model provider",
+    ["agent"]
+))
+MODEL_ERRORS = registry.register(Counter(
+    "resume_reviewer_model_errors_total",
+    "Model calls that raised an error",
+    ["agent"]
+))
+MODEL_RETRIES = registry.register(Counter(
+    "resume_reviewer_model_retries_total",
+    "Model calls retried after a retryable error",
+    ["agent"]
+))
+MODEL_HEDGES = registry.register(Counter(
+    "resume_reviewer_model_hedges_total",
+    "Duplicate model requests sent after the hedge delay, and how many of them answered first",
+    ["agent", "result"]
+))
+MODEL_ESCALATIONS = registry.register(Counter(
+    "resume_reviewer_model_escalations_total",
+    "Calls handed to the next model in the agent's chain, by the model left and why",
+    ["agent", "model", "reason"]
+))
+PROVIDER_WAIT = registry.register(Histogram(
+    "resume_reviewer_provider_wait_seconds",
+    "Time model calls waited for a provider slot and rate budget shared across processes",
+    ["agent"]
+))
+PARSE_FAILURES = registry.register(Counter(
+    "resume_reviewer_parse_failures_total",
+    "Model responses, or items in them, that failed to parse",
+    ["agent"]
+))
+COST = registry.register(Counter(
+    "resume_reviewer_cost_usd_total",
+    "Estimated model spend from token usage and the configured prices",
+    ["agent"]
+))
+SECTION_FALLBACKS = registry.register(Counter(
+    "resume_reviewer_section_fallbacks_total",
+    "Extractions sent the full resume because segmentation was not confident",
+    ["extraction"]
+))
+REVIEW_REUSES = registry.register(Counter(
+    "resume_reviewer_review_reuses_total",
+    "Reviews answered from a stored review of the same or a near-identical resume",
+    ["match"]
+))
+REVIEW_COALESCED = registry.register(Counter(
+    "resume_reviewer_review_coalesced_total",
+    "Reviews that joined an identical review already in flight instead of running the workflow"
+))
+ADMISSION_REJECTIONS = registry.register(Counter(
+    "resume_reviewer_admission_rejections_total",
+    "Requests turned away by admission control",
+    ["reason"]
+))
+HTTP_LATENCY = registry.register(Histogram(
+    "resume_reviewer_http_request_duration_seconds",
+    "Time spent handling each API route",
+    ["method", "route", "status"]
+))
+
+def record_usage(agent: str, response):
+    """Record the token usage a model response reports, if any"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if not usage:
+        token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+        usage = {
+            "input_tokens": token_usage.get("prompt_tokens", 0),
+            "output_tokens": token_usage.get("completion_tokens", 0),
+        }
+    if usage.get("input_tokens"):
+        PROMPT_TOKENS.inc(usage["input_tokens"], agent=agent)
+    if usage.get("output_tokens"):
+        COMPLETION_TOKENS.inc(usage["output_tokens"], agent=agent)
+    
+    # Prices are per 1000 tokens; leave them unset to skip the estimate
+    prompt_price = float(os.getenv("MODEL_PROMPT_PRICE_PER_1K", "0") or 0)
+    completion_price = float(os.getenv("MODEL_COMPLETION_PRICE_PER_1K", "0") or 0)
+    cost = (
+        usage.get("input_tokens", 0) * prompt_price
+        + usage.get("output_tokens", 0) * completion_price
+    ) / 1000
+    if cost:
+        COST.inc(cost, agent=agent)
+
+def snapshot(metric_type, name: str, documentation: str, labelnames: Sequence[str],
+             samples: Dict[Tuple[str, ...], float]) -> _Metric:
+    """Build a metric from values read at scrape time, for use in collectors"""
+    metric = metric_type(name, documentation, labelnames)
+    for values, value in samples.items():
+        metric._values[tuple(str(v) for v in values)] = value
+    return metric
+
+def render_metrics() -> str:
+    """Render all metrics for a scrape"""
+    return registry.render()
@@ -1,28 +1,111 @@
 """Model configurations for the AI Resume Reviewer"""
 import os
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
-from langsmith import Client
-from dotenv import load_dotenv
+import threading
+from typing import List, Optional
 
-load_dotenv()
+# Provider SDKs are imported on first use so importing the app stays fast;
+# entry points load the .env file before anything reads the environment
 
-def get_openai_model(model_name="gpt-4-turbo", temperature=0):
-    """Get OpenAI model instance"""
+# Model clients shared across agents so they reuse one HTTP connection pool
+_model_cache = {}
+_model_cache_lock = threading.Lock()
+
+# Built-in tiers; each is OPENAI_MODEL unless MODEL_TIER_<TIER> names another model
+MODEL_TIERS = ("fast", "strong")
+
+# Agents that turn text into JSON, which a small fast model handles well; they
+# escalate to the strong tier when its output fails validation, apart from the
+# combined extractor, whose failed sections are re-asked one by one instead.
+# Every other agent makes judgment calls and uses the strong tier only.
+EXTRACTION_AGENTS = (
+    "experience_extractor",
+    "education_extractor",
+    "skills_extractor",
+    "combined_extractor",
+    "job_profile_extractor",
+)
+
+def get_openai_model(model_name: Optional[str] = None, temperature=0):
+    """Get OpenAI model instance, for OPENAI_MODEL unless another model is named"""
+    if os.getenv("LLM_PROVIDER", "openai").lower() == "stub":
+        return get_stub_model()
+    
     api_key = os.getenv("OPENAI_API_KEY")
-    model_name = os.getenv("OPENAI_MODEL")
+    model_name = model_name or os.getenv("OPENAI_MODEL")
     if not api_key:
         raise ValueError("OPENAI_API_KEY not found in environment variables")
     if not model_name:
         raise ValueError("OPENAI_MODEL not found in environment variables")
-    return ChatOpenAI(
-        model=model_name,
-        temperature=temperature,
-        openai_api_key=api_key,
-    )
+    key = (model_name, temperature)
+    with _model_cache_lock:
+        if key not in _model_cache:
+            from langchain_openai import ChatOpenAI
+            # Retries and deadlines are handled by app.core.invocation
+            _model_cache[key] = ChatOpenAI(
+                model=model_name,
+                temperature=temperature,
+                openai_api_key=api_key,
+                timeout=float(os.getenv("MODEL_TIMEOUT_SECONDS", "60")),
+                max_retries=0,
+            )
+        return _model_cache[key]
+
+def get_tier_model_name(tier: str) -> Optional[str]:
+    """Get the model name a tier resolves to"""
+    return os.getenv(f"MODEL_TIER_{tier.upper()}") or os.getenv("OPENAI_MODEL")
+
+def get_model_chain(agent: str) -> List[str]:
+    """Get the model names an agent tries in order
+
+    MODEL_CHAIN_<AGENT> lists tiers or model names, e.g. "fast,strong" or
+    "gpt-4o-mini,gpt-4o". Repeated models are tried once.
+    """
+    default = "fast,strong" if agent in EXTRACTION_AGENTS else "strong"
+    chain = []
+    for entry in os.getenv(f"MODEL_CHAIN_{agent.upper()}", default).split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        if entry.lower() in MODEL_TIERS or os.getenv(f"MODEL_TIER_{entry.upper()}"):
+            name = get_tier_model_name(entry)
+        else:
+            name = entry
+        if name and name not in chain:
+            chain.append(name)
+    return chain
+
+def get_agent_models(agent: str, temperature=0) -> list:
+    """Get the model instances an agent tries in order, from cheapest to strongest"""
+    models = []
+    for name in get_model_chain(agent) or [None]:
+        model = get_openai_model(name, temperature)
+        # The replay model stands in for every tier, so it is only tried once
+        if all(model is not other for other in models):
+            models.append(model)
+    return models
+
+async def awarm_model(model):
+    """Make a cheap request so the model's HTTP pool holds an open connection"""
+    client = getattr(model, "root_async_client", None)
+    if client is not None:
+        await client.models.list()
+
+def get_stub_model():
+    """Get the shared offline replay model used in place of OpenAI"""
+    from app.core.stub import create_replay_model
+    with _model_cache_lock:
+        if "stub" not in _model_cache:
+            _model_cache["stub"] = create_replay_model()
+        return _model_cache["stub"]
+
+def clear_model_cache():
+    """Drop the shared model clients so they are rebuilt on next use"""
+    with _model_cache_lock:
+        _model_cache.clear()
 
 def create_langsmith_client():
     """Create LangSmith client for monitoring"""
+    from langsmith import Client
     api_key = os.getenv("LANGSMITH_API_KEY")
     if not api_key:
         raise ValueError("LANGSMITH_API_KEY not found in environment variables")
@@ -31,4 +114,5 @@ def create_langsmith_client():
 
 def create_prompt(template):
     """Create a prompt from template"""
+    from langchain_core.prompts import ChatPromptTemplate
     return ChatPromptTemplate.from_template(template) 
\ No newline at end of file
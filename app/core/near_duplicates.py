@@ -0,0 +1,247 @@
+"""MinHash/LSH index of reviewed resumes, for reusing a review when a near-identical resume comes back"""
+import difflib
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.core.cache import content_hash, normalize_text, open_database
+
+# Signature size and banding: 32 bands of 4 rows make pairs above ~0.9 similarity
+# candidates almost surely, and candidates are then checked on the full signature
+NUM_PERMUTATIONS = 128
+BANDS = 32
+ROWS = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+
+# Universal hashing modulo a Mersenne prime, with fixed coefficients so
+# signatures stay comparable across processes and restarts
+MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.default_rng(20240601)
+_coef_a = _rng.integers(1, (1 << 31) - 1, NUM_PERMUTATIONS, dtype=np.uint64)
+_coef_b = _rng.integers(0, (1 << 31) - 1, NUM_PERMUTATIONS, dtype=np.uint64)
+
+# Details that change between resubmissions without changing the candidate
+VOLATILE_PATTERNS = [
+    (re.compile(r"\S+@\S+\.\w+"), " <email> "),
+    (re.compile(r"(https?://|www\.)\S+"), " <url> "),
+    (re.compile(r"\+?\d[\d\s().-]{6,}\d"), " <phone> "),
+    (re.compile(r"\b(19|20)\d\d\b"), " <year> "),
+]
+TOKEN = re.compile(r"<\w+>|\w+")
+
+# Changed lines reported per side when a review is reused
+MAX_CHANGED_LINES = 20
+
+# Seconds between sweeps of expired entries, which are otherwise only skipped by lookups
+PRUNE_INTERVAL = 60.0
+
+def normalize_resume(text: str) -> List[str]:
+    """Lowercase a resume, mask contact details and years, and split it into words"""
+    text = normalize_text(text).lower()
+    for pattern, replacement in VOLATILE_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return TOKEN.findall(text)
+
+def minhash_signature(text: str) -> np.ndarray:
+    """Get the MinHash signature of a resume's word shingles"""
+    words = normalize_resume(text)
+    shingles = {
+        " ".join(words[i:i + SHINGLE_SIZE])
+        for i in range(max(1, len(words) - SHINGLE_SIZE + 1))
+    }
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+         for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+    permuted = (_coef_a[:, None] * hashes[None, :] + _coef_b[:, None]) % MERSENNE_PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimate the Jaccard similarity of two resumes from their signatures"""
+    return float(np.mean(first == second))
+
+def band_keys(signature: np.ndarray) -> List[bytes]:
+    """Split a signature into the LSH band keys it is filed under"""
+    return [signature[band * ROWS:(band + 1) * ROWS].tobytes() for band in range(BANDS)]
+
+def describe_changes(previous: str, current: str) -> Dict[str, List[str]]:
+    """List the lines added and removed between two versions of a resume"""
+    old = [line.strip() for line in previous.splitlines() if line.strip()]
+    new = [line.strip() for line in current.splitlines() if line.strip()]
+    added, removed = [], []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+        if tag in ("replace", "delete"):
+            removed.extend(old[i1:i2])
+        if tag in ("replace", "insert"):
+            added.extend(new[j1:j2])
+    # Reordered lines show up on both sides; they are not changes
+    moved = set(added) & set(removed)
+    return {
+        "added": [line for line in added if line not in moved][:MAX_CHANGED_LINES],
+        "removed": [line for line in removed if line not in moved][:MAX_CHANGED_LINES],
+    }
+
+class NearDuplicateIndex:
+    """Reviews indexed by job description and MinHash signature of the resume
+
+    Signatures and LSH buckets are held in memory; reviews, resume texts and
+    signatures are persisted to SQLite. Before each lookup the index picks up
+    entries added since it last looked, including those from other processes.
+    Expired entries and the oldest beyond max_entries are pruned from both
+    every PRUNE_INTERVAL seconds, or as soon as the cap is exceeded.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.9, ttl: Optional[float] = None,
+                 max_entries: int = 10000):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be between 0 and 1")
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.path = path
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._buckets: Dict[Tuple[str, int, bytes], List[int]] = {}
+        self._entries: Dict[int, Tuple[np.ndarray, float, str, str]] = {}
+        self._known = set()
+        self._last_id = 0
+        self._last_prune = 0.0
+
+        self._conn = open_database(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reviews ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " jd_hash TEXT NOT NULL,"
+            " resume_hash TEXT NOT NULL,"
+            " resume TEXT NOT NULL,"
+            " signature BLOB NOT NULL,"
+            " review TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._prune(time.time())
+
+    def _sync(self):
+        """Load entries added since the last lookup"""
+        rows = self._conn.execute(
+            "SELECT id, jd_hash, resume_hash, signature, created_at FROM reviews WHERE id > ? ORDER BY id",
+            (self._last_id,)
+        ).fetchall()
+        for entry_id, jd_hash, resume_hash, blob, created_at in rows:
+            signature = np.frombuffer(blob, dtype=np.uint32)
+            self._entries[entry_id] = (signature, created_at, jd_hash, resume_hash)
+            self._known.add((jd_hash, resume_hash))
+            for band, key in enumerate(band_keys(signature)):
+                self._buckets.setdefault((jd_hash, band, key), []).append(entry_id)
+            self._last_id = entry_id
+        now = time.time()
+        if len(self._entries) > self.max_entries or now - self._last_prune >= PRUNE_INTERVAL:
+            self._prune(now)
+
+    def _prune(self, now: float):
+        """Drop expired entries and the oldest ones beyond max_entries, from SQLite and memory"""
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM reviews WHERE created_at < ?", (now - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM reviews WHERE id IN (SELECT id FROM reviews ORDER BY id DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+        self._conn.commit()
+
+        ids = sorted(self._entries)
+        stale = ids[:max(0, len(ids) - self.max_entries)]
+        if self.ttl is not None:
+            stale += [entry_id for entry_id in ids[len(stale):] if now - self._entries[entry_id][1] > self.ttl]
+        for entry_id in stale:
+            self._forget(entry_id)
+        self._last_prune = now
+
+    def _forget(self, entry_id: int):
+        """Remove an entry from the in-memory signatures and buckets"""
+        signature, _, jd_hash, resume_hash = self._entries.pop(entry_id)
+        self._known.discard((jd_hash, resume_hash))
+        for band, key in enumerate(band_keys(signature)):
+            bucket = self._buckets.get((jd_hash, band, key))
+            if bucket is None:
+                continue
+            bucket.remove(entry_id)
+            if not bucket:
+                del self._buckets[(jd_hash, band, key)]
+
+    def find(self, resume: str, job_description: str) -> Optional[Dict[str, Any]]:
+        """Get the stored review of the most similar resume for the same job description
+
+        Returns None when no stored resume reaches the threshold. Otherwise
+        returns the review with its entry ID, similarity and the lines that
+        changed since the stored resume.
+        """
+        jd_hash = content_hash(job_description)
+        signature = minhash_signature(resume)
+        now = time.time()
+        with self._lock:
+            self._sync()
+            candidates = set()
+            for band, key in enumerate(band_keys(signature)):
+                candidates.update(self._buckets.get((jd_hash, band, key), ()))
+            best_id, best = None, 0.0
+            for entry_id in candidates:
+                stored, created_at, _, _ = self._entries[entry_id]
+                if self.ttl is not None and now - created_at > self.ttl:
+                    continue
+                score = similarity(signature, stored)
+                if score > best:
+                    best_id, best = entry_id, score
+            if best_id is None or best < self.threshold:
+                return None
+            row = self._conn.execute("SELECT resume, review FROM reviews WHERE id = ?", (best_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": best_id,
+            "similarity": round(best, 3),
+            "changes": describe_changes(row[0], resume),
+            "review": json.loads(row[1]),
+        }
+
+    def add(self, resume: str, job_description: str, review: Dict[str, Any]):
+        """Index a finished review, unless the same resume is already indexed for the job description"""
+        jd_hash = content_hash(job_description)
+        resume_hash = content_hash(resume)
+        signature = minhash_signature(resume)
+        with self._lock:
+            self._sync()
+            if (jd_hash, resume_hash) in self._known:
+                return
+            self._conn.execute(
+                "INSERT INTO reviews (jd_hash, resume_hash, resume, signature, review, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (jd_hash, resume_hash, resume, signature.tobytes(), json.dumps(review), time.time())
+            )
+            self._conn.commit()
+            self._sync()
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            self._conn.close()
+
+def near_duplicates_enabled() -> bool:
+    """Check whether reviews of near-identical resumes are reused"""
+    return os.getenv("NEAR_DUPLICATE_ENABLED", "true").lower() == "true"
+
+def create_near_duplicate_index() -> NearDuplicateIndex:
+    """Create the near-duplicate index from environment variables"""
+    ttl = os.getenv("NEAR_DUPLICATE_TTL_SECONDS", "604800")
+    return NearDuplicateIndex(
+        path=os.getenv("NEAR_DUPLICATE_INDEX_PATH", ".cache/near_duplicates.db"),
+        threshold=float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.9")),
+        ttl=float(ttl) if ttl else None,
+        max_entries=int(os.getenv("NEAR_DUPLICATE_MAX_ENTRIES", "10000")),
+    )
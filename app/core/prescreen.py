@@ -0,0 +1,109 @@
+"""Local lexical pre-screening of resumes before any LLM call"""
+import os
+import re
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+# Terms keep characters that matter in skill names, e.g. c++, c#, node.js
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+STOPWORDS = frozenset("""
+a about above across after all also an and any are as at be been being both but by can
+could do does during each either etc for from has have having he her his how if in into
+is it its may more most must no not of on or other our out over per should so some such
+than that the their them then there these they this those through to under up us using
+via was we well were what when where which while who will with within would you your
+""".split())
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase skill-like terms"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall((text or "").lower()):
+        token = token.rstrip(".")
+        if len(token) > 1 and token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+def query_terms(job_description: str, job_profile=None) -> List[str]:
+    """Get the distinct terms resumes are screened against"""
+    if job_profile is not None:
+        text = " ".join(job_profile.must_have_skills + job_profile.nice_to_have_skills)
+    else:
+        text = job_description
+    return list(dict.fromkeys(tokenize(text)))
+
+def score_batch(terms: List[str], documents: List[str]) -> Dict[str, np.ndarray]:
+    """Score documents against query terms with BM25 over a vocabulary shared by the batch
+
+    Returns the BM25 score, for ranking within the batch, and the share of query
+    terms each document contains ("coverage", 0-1), which does not depend on the
+    rest of the batch. Both are arrays aligned with documents.
+    """
+    n_docs = len(documents)
+    vocabulary = {term: i for i, term in enumerate(terms)}
+    counts = np.zeros((n_docs, len(terms)), dtype=np.float64)
+    lengths = np.zeros(n_docs, dtype=np.float64)
+
+    for row, document in enumerate(documents):
+        tokens = tokenize(document)
+        lengths[row] = len(tokens)
+        ids = np.fromiter(
+            (vocabulary[token] for token in tokens if token in vocabulary),
+            dtype=np.int64
+        )
+        if ids.size:
+            np.add.at(counts[row], ids, 1.0)
+
+    if n_docs == 0 or not terms:
+        return {"bm25": np.zeros(n_docs), "coverage": np.zeros(n_docs)}
+
+    document_frequency = (counts > 0).sum(axis=0)
+    idf = np.log((n_docs - document_frequency + 0.5) / (document_frequency + 0.5) + 1.0)
+    average_length = lengths.mean() or 1.0
+    norm = K1 * (1.0 - B + B * lengths / average_length)
+    bm25 = (idf * counts * (K1 + 1.0) / (counts + norm[:, None])).sum(axis=1)
+    coverage = (counts > 0).mean(axis=1)
+    return {"bm25": bm25, "coverage": coverage}
+
+def get_prescreen_settings() -> Dict[str, Optional[float]]:
+    """Get the default pre-screening cutoffs from environment variables"""
+    min_coverage = os.getenv("PRESCREEN_MIN_COVERAGE", "")
+    top_k = os.getenv("PRESCREEN_TOP_K", "")
+    return {
+        "min_coverage": float(min_coverage) if min_coverage else None,
+        "top_k": int(top_k) if top_k else None,
+    }
+
+def prescreen(job_description: str,
+              resumes: List[str],
+              job_profile=None,
+              min_coverage: Optional[float] = None,
+              top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Score resumes locally and mark which ones go on to the LLM workflow
+
+    A resume passes when it reaches min_coverage and ranks within the top_k by
+    BM25; a cutoff left as None is not applied. Entries are aligned with resumes.
+    """
+    scores = score_batch(query_terms(job_description, job_profile), resumes)
+    order = np.argsort(-scores["bm25"], kind="stable")
+    ranks = np.empty(len(resumes), dtype=np.int64)
+    ranks[order] = np.arange(len(resumes))
+
+    entries = []
+    for i in range(len(resumes)):
+        passed = True
+        if min_coverage is not None and scores["coverage"][i] < min_coverage:
+            passed = False
+        if top_k is not None and ranks[i] >= top_k:
+            passed = False
+        entries.append({
+            "bm25": float(scores["bm25"][i]),
+            "coverage": float(scores["coverage"][i]),
+            "rank": int(ranks[i]),
+            "passed": passed,
+        })
+    return entries
@@ -0,0 +1,248 @@
+"""Compact prompt serialization and per-node token budgets"""
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+from app.utils.logger import setup_logging
+
+# Set up logger
+logger = setup_logging()
+
+# Default prompt budgets in tokens, overridable with TOKEN_BUDGET_<NODE>
+DEFAULT_TOKEN_BUDGETS = {
+    "profile_job": 16000,
+    "extract_experience": 16000,
+    "extract_education": 16000,
+    "extract_skills": 16000,
+    "extract_fused": 16000,
+    "analyze_match": 8000,
+    "generate_score": 4000,
+}
+
+# Rough characters per token, used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+# Least of a resume or job description kept when a template leaves no room for it
+MIN_TEXT_TOKENS = 256
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+def _get_encoding():
+    """Load the tiktoken encoding once, or None to fall back to an estimate"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                if os.getenv("TOKEN_COUNTER", "tiktoken").lower() == "tiktoken":
+                    try:
+                        import tiktoken
+                        try:
+                            _encoding = tiktoken.encoding_for_model(os.getenv("OPENAI_MODEL", ""))
+                        except KeyError:
+                            _encoding = tiktoken.get_encoding("cl100k_base")
+                    except Exception as e:
+                        logger.warning(f"Tokenizer unavailable, estimating token counts: {str(e)}")
+                _encoding_loaded = True
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """Count the tokens in a prompt"""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most max_tokens tokens, keeping the beginning"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * CHARS_PER_TOKEN]
+
+def get_token_budget(node: str) -> Optional[int]:
+    """Get the prompt token budget for a node, or None for no limit"""
+    value = os.getenv(f"TOKEN_BUDGET_{node.upper()}")
+    if value is None:
+        return DEFAULT_TOKEN_BUDGETS.get(node)
+    budget = int(value)
+    return budget if budget > 0 else None
+
+class TokenStats:
+    """Per-node prompt token counters for monitoring"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes = {}
+
+    def record(self, node: str, tokens: int, truncated: bool):
+        """Record one prompt sent by a node"""
+        with self._lock:
+            stats = self._nodes.setdefault(node, {
+                "prompts": 0,
+                "prompt_tokens": 0,
+                "last_prompt_tokens": 0,
+                "max_prompt_tokens": 0,
+                "truncated_prompts": 0,
+            })
+            stats["prompts"] += 1
+            stats["prompt_tokens"] += tokens
+            stats["last_prompt_tokens"] = tokens
+            stats["max_prompt_tokens"] = max(stats["max_prompt_tokens"], tokens)
+            if truncated:
+                stats["truncated_prompts"] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Get a copy of the counters"""
+        with self._lock:
+            return {node: dict(stats) for node, stats in self._nodes.items()}
+
+    def reset(self):
+        """Clear all counters"""
+        with self._lock:
+            self._nodes.clear()
+
+# Shared token counters for the process
+token_stats = TokenStats()
+
+def get_token_stats() -> Dict[str, Dict[str, int]]:
+    """Get prompt token counters per node"""
+    return token_stats.snapshot()
+
+def fit_prompt(node: str, build: Callable[[], str], reductions: List[Callable[[], bool]] = ()) -> str:
+    """Build a prompt and apply reductions in order until it fits the node's budget
+
+    Each reduction shrinks the prompt inputs by one deterministic step and returns
+    False once it has nothing left to remove, which moves on to the next one.
+    """
+    budget = get_token_budget(node)
+    prompt = build()
+    tokens = count_tokens(prompt)
+    truncated = False
+
+    steps = iter(reductions)
+    step = next(steps, None)
+    while budget is not None and tokens > budget and step is not None:
+        if step():
+            truncated = True
+            prompt = build()
+            tokens = count_tokens(prompt)
+        else:
+            step = next(steps, None)
+
+    if budget is not None and tokens > budget:
+        logger.warning(f"Prompt for {node} is {tokens} tokens, over its budget of {budget}")
+    token_stats.record(node, tokens, truncated)
+    return prompt
+
+def fit_text_prompt(node: str, build: Callable[[str], str], text: str) -> str:
+    """Build a prompt around one long text, truncating the text to fit the node's budget
+
+    The text keeps at least MIN_TEXT_TOKENS tokens even when that goes over the
+    budget, since a prompt without it cannot be answered.
+    """
+    budget = get_token_budget(node)
+    prompt = build(text)
+    tokens = count_tokens(prompt)
+    truncated = False
+
+    if budget is not None and tokens > budget:
+        overhead = count_tokens(build(""))
+        available = budget - overhead
+        if available < MIN_TEXT_TOKENS:
+            logger.warning(
+                f"Template for {node} takes {overhead} of its {budget} token budget, "
+                f"keeping the first {MIN_TEXT_TOKENS} tokens of the text anyway"
+            )
+            available = MIN_TEXT_TOKENS
+        prompt = build(truncate_to_tokens(text, available))
+        tokens = count_tokens(prompt)
+        truncated = True
+
+    if budget is not None and tokens > budget:
+        logger.warning(f"Prompt for {node} is {tokens} tokens, over its budget of {budget}")
+    token_stats.record(node, tokens, truncated)
+    return prompt
+
+def render_experiences(experiences) -> str:
+    """Render work experiences one per line"""
+    if not experiences:
+        return "None"
+    lines = []
+    for exp in experiences:
+        line = f"- {exp.title} @ {exp.company} ({exp.start_date} - {exp.end_date})"
+        if exp.description:
+            line += f": {exp.description}"
+        if exp.skills_used:
+            line += f" [skills: {', '.join(exp.skills_used)}]"
+        lines.append(line)
+    return "\n".join(lines)
+
+def render_education(education) -> str:
+    """Render education entries one per line"""
+    if not education:
+        return "None"
+    lines = []
+    for edu in education:
+        line = f"- {edu.degree}, {edu.field_of_study} @ {edu.institution} ({edu.graduation_date})"
+        if edu.achievements:
+            line += f" [achievements: {'; '.join(edu.achievements)}]"
+        lines.append(line)
+    return "\n".join(lines)
+
+def render_skills(skills) -> str:
+    """Render skills on one line as name (category, level, relevance)"""
+    if not skills:
+        return "None"
+    return "; ".join(
+        f"{skill.name} ({skill.category}, {skill.level}, {skill.relevance:.2f})"
+        for skill in skills
+    )
+
+def render_match_analysis(match_analysis) -> str:
+    """Render a match analysis as compact lines"""
+    lines = [
+        f"Experience match: {match_analysis.experience_match:.2f}",
+        f"Education match: {match_analysis.education_match:.2f}",
+        f"Skills match: {match_analysis.skills_match:.2f}",
+    ]
+    if match_analysis.strengths:
+        lines.append("Strengths: " + "; ".join(match_analysis.strengths))
+    if match_analysis.gaps:
+        lines.append("Gaps: " + "; ".join(match_analysis.gaps))
+    return "\n".join(lines)
+
+def drop_lowest_relevance(skills: list, keep: int = 0) -> Callable[[], bool]:
+    """Reduction that removes the least relevant skill, the last one on ties"""
+    def step() -> bool:
+        if len(skills) <= keep:
+            return False
+        lowest = min(range(len(skills)), key=lambda i: (skills[i].relevance, -i))
+        del skills[lowest]
+        return True
+    return step
+
+def shorten_descriptions(experiences: list, max_chars: int) -> Callable[[], bool]:
+    """Reduction that cuts every experience description to max_chars"""
+    def step() -> bool:
+        changed = False
+        for i, exp in enumerate(experiences):
+            if len(exp.description) > max_chars:
+                experiences[i] = exp.model_copy(update={"description": exp.description[:max_chars].rstrip() + "..."})
+                changed = True
+        return changed
+    return step
+
+def drop_last(items: list) -> Callable[[], bool]:
+    """Reduction that removes the last item of a list"""
+    def step() -> bool:
+        if not items:
+            return False
+        items.pop()
+        return True
+    return step
@@ -0,0 +1,116 @@
+"""Batch ranking of many resumes against one job description"""
+import asyncio
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from app.core.prescreen import prescreen
+from app.core.registry import get_graph
+from app.core.workflow import aget_job_profile, job_profile_enabled, mean_match_score
+from app.utils.logger import setup_logging
+
+# Set up logger
+logger = setup_logging()
+
+def overall_score(result: Dict[str, Any]) -> float:
+    """Get the overall score of a workflow result"""
+    review_result = result.get("review_result")
+    if review_result is not None:
+        return review_result.overall_score
+    match_analysis = result.get("match_analysis")
+    if match_analysis is not None:
+        return mean_match_score(match_analysis)
+    return 0.0
+
+def summarize_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a workflow result to a JSON-serializable ranking entry"""
+    match_analysis = result.get("match_analysis")
+    review_result = result.get("review_result")
+    return {
+        "overall_score": overall_score(result),
+        "match_analysis": match_analysis.model_dump() if match_analysis is not None else None,
+        "review_result": review_result.model_dump() if review_result is not None else None,
+    }
+
+def get_rank_workers() -> int:
+    """Get the most resumes reviewed at once in a batch, which is also the default"""
+    workers = int(os.getenv("RANK_MAX_WORKERS", "4"))
+    if workers < 1:
+        raise ValueError("RANK_MAX_WORKERS must be at least 1")
+    return workers
+
+async def rank_resumes(job_description: str,
+                       resumes: List[Tuple[str, str]],
+                       max_workers: int = None,
+                       min_coverage: Optional[float] = None,
+                       top_k: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Review (id, resume) pairs against one job description, yielding each entry as it finishes
+
+    When min_coverage or top_k is set, resumes are first scored locally and only
+    those that pass go through the LLM workflow; the rest are yielded straight
+    away with status "screened_out". max_workers is capped at RANK_MAX_WORKERS,
+    since the whole batch takes a single admission slot.
+    """
+    graph = get_graph()
+    limit = get_rank_workers()
+    semaphore = asyncio.Semaphore(min(max_workers or limit, limit))
+    
+    # Profile the job description once for the whole batch
+    job_profile = await aget_job_profile(job_description) if job_profile_enabled() else None
+    
+    # Cheap lexical pass so clear mismatches never reach the model
+    screening = [None] * len(resumes)
+    if min_coverage is not None or top_k is not None:
+        screening = prescreen(
+            job_description,
+            [resume for _, resume in resumes],
+            job_profile=job_profile,
+            min_coverage=min_coverage,
+            top_k=top_k
+        )
+        passed = sum(entry["passed"] for entry in screening)
+        logger.info(f"Pre-screening passed {passed} of {len(resumes)} resumes")
+    
+    async def review(candidate_id: str, resume: str, screen: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if screen is not None and not screen["passed"]:
+            return {"id": candidate_id, "status": "screened_out", "overall_score": 0.0, "prescreen": screen}
+        entry = await run_review(candidate_id, resume)
+        if screen is not None:
+            entry["prescreen"] = screen
+        return entry
+    
+    async def run_review(candidate_id: str, resume: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await graph.ainvoke({
+                    "resume": resume,
+                    "job_description": job_description,
+                    "job_profile": job_profile
+                })
+                if result.get("match_analysis") is None:
+                    return {"id": candidate_id, "status": "error", "error": "Review processing failed"}
+                return {"id": candidate_id, "status": "ok", **summarize_result(result)}
+            except Exception as e:
+                logger.error(f"Error ranking resume {candidate_id}: {str(e)}")
+                return {"id": candidate_id, "status": "error", "error": str(e)}
+    
+    tasks = [
+        asyncio.create_task(review(candidate_id, resume, screen))
+        for (candidate_id, resume), screen in zip(resumes, screening)
+    ]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        # Stop outstanding reviews if the caller goes away
+        for task in tasks:
+            task.cancel()
+
+def sort_ranking(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Sort entries by overall score, best first, with screened-out and failed entries last"""
+    return sorted(
+        entries,
+        key=lambda entry: (
+            entry["status"] != "ok",
+            -entry.get("overall_score", 0.0),
+            -(entry.get("prescreen") or {}).get("bm25", 0.0)
+        )
+    )
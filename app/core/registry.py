@@ -0,0 +1,104 @@
+"""Process-wide registry of agents and compiled workflow graphs"""
+import threading
+import time
+from dotenv import load_dotenv
+from app.core.cache import create_extraction_cache
+from app.core.models import clear_model_cache
+
+class AgentRegistry:
+    """Builds agents and compiled graphs once per process and shares them"""
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._agents = None
+        self._graphs = {}
+        self._extraction_cache = None
+        
+    def get_agents(self):
+        """Get the shared agent instances, building them on first use"""
+        if self._agents is None:
+            with self._lock:
+                if self._agents is None:
+                    from app.core.workflow import setup_extractors
+                    self._agents = setup_extractors()
+        return self._agents
+    
+    def get_graph(self, extraction_mode: str = None):
+        """Get the compiled workflow graph for an extraction mode"""
+        from app.core.workflow import create_resume_review_graph, get_extraction_mode
+        mode = extraction_mode or get_extraction_mode()
+        graph = self._graphs.get(mode)
+        if graph is None:
+            with self._lock:
+                graph = self._graphs.get(mode)
+                if graph is None:
+                    graph = create_resume_review_graph(mode)
+                    self._graphs[mode] = graph
+        return graph
+    
+    def get_extraction_cache(self):
+        """Get the shared extraction cache"""
+        if self._extraction_cache is None:
+            with self._lock:
+                if self._extraction_cache is None:
+                    self._extraction_cache = create_extraction_cache()
+        return self._extraction_cache
+    
+    def prewarm(self, extraction_mode: str = None) -> float:
+        """Build everything the first request needs and return the seconds it took"""
+        from app.core.prompting import count_tokens
+        start = time.perf_counter()
+        self.get_agents()
+        self.get_graph(extraction_mode)
+        self.get_extraction_cache()
+        # Loads the tokenizer's encoding
+        count_tokens("prewarm")
+        return time.perf_counter() - start
+    
+    async def awarm_connections(self):
+        """Open a connection to each model provider so the first call skips DNS and TLS setup"""
+        from app.core.models import awarm_model
+        models = {id(model): model for agent in self.get_agents().values() for model in agent.models}
+        for model in models.values():
+            await awarm_model(model)
+    
+    def reload(self):
+        """Drop all shared instances so they are rebuilt from the current configuration"""
+        with self._lock:
+            from app.core.invocation import reset_invocation_state
+            # Values already in the environment win, as at startup, so callers can set overrides first
+            load_dotenv()
+            clear_model_cache()
+            reset_invocation_state()
+            self._agents = None
+            self._graphs = {}
+            if self._extraction_cache is not None:
+                self._extraction_cache.close()
+                self._extraction_cache = None
+
+# Shared registry for the process
+registry = AgentRegistry()
+
+def get_agents():
+    """Get the shared agent instances"""
+    return registry.get_agents()
+
+def get_graph(extraction_mode: str = None):
+    """Get the shared compiled workflow graph"""
+    return registry.get_graph(extraction_mode)
+
+def get_extraction_cache():
+    """Get the shared extraction cache"""
+    return registry.get_extraction_cache()
+
+def prewarm(extraction_mode: str = None) -> float:
+    """Build the shared agents, graph and cache ahead of the first request"""
+    return registry.prewarm(extraction_mode)
+
+async def awarm_connections():
+    """Open the model providers' HTTP connection pools ahead of the first request"""
+    await registry.awarm_connections()
+
+def reload_registry():
+    """Rebuild agents, model clients and graphs after a configuration change"""
+    registry.reload()
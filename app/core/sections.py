@@ -0,0 +1,151 @@
+"""Rule-based splitting of resume text into sections"""
+import functools
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Heading phrases for each section, compared after normalization
+SECTION_HEADINGS = {
+    "summary": [
+        "summary", "professional summary", "profile", "professional profile", "objective",
+        "career objective", "about", "about me",
+    ],
+    "experience": [
+        "experience", "work experience", "professional experience", "employment",
+        "employment history", "work history", "career history", "relevant experience",
+        "internships", "internship", "internship experience",
+    ],
+    "education": [
+        "education", "academic background", "academics", "education and training",
+        "educational qualifications", "qualifications", "academic qualifications",
+    ],
+    "skills": [
+        "skills", "technical skills", "key skills", "core skills", "core competencies",
+        "competencies", "technologies", "tech stack", "tools and technologies", "expertise",
+        "skills and tools", "areas of expertise",
+    ],
+    "projects": [
+        "projects", "personal projects", "key projects", "academic projects", "side projects",
+        "selected projects", "open source",
+    ],
+    "achievements": [
+        "achievements", "accomplishments", "awards", "honors", "honours", "awards and honors",
+        "certifications", "certificates", "publications", "extracurricular activities",
+    ],
+}
+
+HEADING_LOOKUP = {
+    phrase: section
+    for section, phrases in SECTION_HEADINGS.items()
+    for phrase in phrases
+}
+
+# Markdown markers, bullets, numbering and decoration around a heading
+HEADING_DECORATION = re.compile(r"^[#*_=\-\s\d.)|•◦]+|[#*_=\-:\s|•◦]+$")
+UNDERLINE = re.compile(r"^\s*[-=_]{3,}\s*$")
+
+# Sections each extractor needs; the first one listed must be found for the
+# extractor to get a slice instead of the whole resume. Skills used in each
+# role are already extracted with the experience, so the skills extractor
+# only needs the sections that list skills.
+SECTION_ROUTES = {
+    "experiences": ("experience",),
+    "education": ("education", "achievements"),
+    "skills": ("skills", "summary", "projects", "achievements"),
+}
+
+# A section this short is more likely a stray heading match than a real section
+MIN_SECTION_CHARS = 20
+
+# Above this share of the text before the first heading, headings were probably missed
+MAX_PREAMBLE_SHARE = 0.3
+
+class Segmentation:
+    """Resume text split into sections, with a confidence score for the split"""
+
+    def __init__(self, text: str, preamble: str, sections: Dict[str, str], confidence: float):
+        self.text = text
+        self.preamble = preamble
+        self.sections = sections
+        self.confidence = confidence
+
+    def get(self, names: Tuple[str, ...]) -> Optional[str]:
+        """Get the text of the named sections, or None if the first one was not found"""
+        if not names or len(self.sections.get(names[0], "")) < MIN_SECTION_CHARS:
+            return None
+        parts = [self.sections[name] for name in names if self.sections.get(name)]
+        return "\n\n".join(parts)
+
+def match_heading(line: str) -> Optional[str]:
+    """Get the section a line is a heading for, or None if it is not a heading"""
+    stripped = line.strip()
+    # Headings are short lines without sentence punctuation
+    if not stripped or len(stripped) > 40 or stripped.endswith((".", ",", ";")):
+        return None
+    phrase = HEADING_DECORATION.sub("", stripped).lower().replace("&", "and")
+    phrase = " ".join(phrase.split())
+    return HEADING_LOOKUP.get(phrase)
+
+@functools.lru_cache(maxsize=256)
+def segment_resume(text: str) -> Segmentation:
+    """Split a resume into sections by detecting heading lines
+
+    Lines before the first heading (usually the name and contact details) form
+    the preamble. A section that appears under several headings, e.g. two
+    experience blocks, is concatenated. Confidence is 0 when fewer than two
+    distinct sections are found or when most of the text comes before the
+    first heading, and otherwise the share of the text under a heading.
+    """
+    lines = (text or "").splitlines()
+    preamble = []
+    parts: Dict[str, List[str]] = {}
+    current = None
+    for line in lines:
+        if UNDERLINE.match(line):
+            continue
+        section = match_heading(line)
+        if section is not None:
+            current = section
+            parts.setdefault(section, [])
+            continue
+        if current is None:
+            preamble.append(line)
+        else:
+            parts[current].append(line)
+
+    sections = {name: "\n".join(section_lines).strip() for name, section_lines in parts.items()}
+    preamble_text = "\n".join(preamble).strip()
+    total = len(text.strip()) if text else 0
+    if total == 0:
+        return Segmentation(text, preamble_text, sections, 0.0)
+
+    covered = sum(len(section) for section in sections.values())
+    confidence = min(1.0, covered / total)
+    found = [name for name, section in sections.items() if len(section) >= MIN_SECTION_CHARS]
+    if len(found) < 2 or len(preamble_text) / total > MAX_PREAMBLE_SHARE:
+        confidence = 0.0
+    return Segmentation(text, preamble_text, sections, confidence)
+
+def section_routing_enabled() -> bool:
+    """Check whether extractors get only their sections of the resume"""
+    return os.getenv("SECTION_ROUTING_ENABLED", "true").lower() == "true"
+
+def get_min_confidence() -> float:
+    """Get the segmentation confidence below which extractors get the full resume"""
+    return float(os.getenv("SECTION_MIN_CONFIDENCE", "0.6"))
+
+def route_resume(resume: str, extraction: str) -> Tuple[str, bool]:
+    """Get the part of a resume an extraction needs, and whether it is a slice
+
+    Falls back to the full text when routing is disabled, the segmentation is
+    not confident enough or the extraction's main section was not found.
+    """
+    if not section_routing_enabled():
+        return resume, False
+    segmentation = segment_resume(resume)
+    if segmentation.confidence < get_min_confidence():
+        return resume, False
+    text = segmentation.get(SECTION_ROUTES[extraction])
+    if text is None:
+        return resume, False
+    return text, True
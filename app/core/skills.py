@@ -0,0 +1,318 @@
+"""Canonical skill index and deterministic, vectorized matching of skills against job requirements"""
+import functools
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from pydantic import BaseModel, Field
+
+# Canonical skill names and the other ways resumes and job descriptions write them
+DEFAULT_SKILL_ALIASES = {
+    # Languages
+    "python": ["python3", "python 3"],
+    "java": ["java 8", "java 11", "java 17", "core java", "j2ee", "java ee"],
+    "scala": [],
+    "go": ["golang", "go lang"],
+    "c": ["c language", "ansi c"],
+    "c++": ["cpp", "c plus plus"],
+    "c#": ["c sharp", "csharp"],
+    "javascript": ["js", "ecmascript", "es6", "vanilla js"],
+    "typescript": [],
+    "ruby": [],
+    "php": [],
+    "kotlin": [],
+    "swift": [],
+    "rust": [],
+    "r": ["r language", "r programming"],
+    "bash": ["shell", "shell scripting", "bash scripting", "unix shell"],
+    "sql": ["structured query language", "t sql", "tsql", "pl sql", "plsql"],
+    # Data processing
+    "spark": ["apache spark", "pyspark", "spark sql", "spark core", "spark streaming", "structured streaming"],
+    "hadoop": ["apache hadoop", "mapreduce", "map reduce"],
+    "hdfs": ["hadoop distributed file system"],
+    "hive": ["apache hive", "hiveql", "hive ql"],
+    "kafka": ["apache kafka", "kafka streams", "confluent kafka"],
+    "flink": ["apache flink"],
+    "airflow": ["apache airflow"],
+    "oozie": ["apache oozie"],
+    "beam": ["apache beam"],
+    "presto": ["trino", "prestodb"],
+    "etl": ["elt", "etl pipelines", "data pipelines", "data pipeline"],
+    "data modeling": ["data modelling", "dimensional modeling", "dimensional modelling"],
+    "dbt": ["data build tool"],
+    "snowflake": [],
+    "bigquery": ["google bigquery", "big query"],
+    "redshift": ["amazon redshift", "aws redshift"],
+    "databricks": [],
+    # Databases and queues
+    "postgresql": ["postgres", "psql", "postgre sql"],
+    "mysql": ["my sql"],
+    "sqlite": [],
+    "oracle": ["oracle db", "oracle database"],
+    "sql server": ["mssql", "ms sql", "microsoft sql server"],
+    "mongodb": ["mongo", "mongo db"],
+    "cassandra": ["apache cassandra"],
+    "redis": [],
+    "elasticsearch": ["elastic search", "opensearch"],
+    "dynamodb": ["dynamo db", "amazon dynamodb"],
+    "hbase": ["apache hbase"],
+    "rabbitmq": ["rabbit mq"],
+    "sqs": ["amazon sqs", "aws sqs", "simple queue service"],
+    # Cloud and infrastructure
+    "aws": ["amazon web services"],
+    "ec2": ["amazon ec2", "aws ec2"],
+    "s3": ["amazon s3", "aws s3"],
+    "lambda": ["aws lambda"],
+    "emr": ["amazon emr", "aws emr", "elastic mapreduce"],
+    "azure": ["microsoft azure"],
+    "gcp": ["google cloud", "google cloud platform"],
+    "docker": ["containerization"],
+    "kubernetes": ["k8s"],
+    "terraform": [],
+    "ansible": [],
+    "jenkins": [],
+    "ci/cd": ["ci cd", "cicd", "continuous integration", "continuous delivery", "continuous deployment"],
+    "git": ["github", "gitlab", "bitbucket"],
+    "linux": ["unix"],
+    "nginx": [],
+    # Frameworks
+    "ruby on rails": ["rails"],
+    "django": [],
+    "flask": [],
+    "fastapi": ["fast api"],
+    "spring": ["spring boot", "springboot", "spring framework"],
+    "node.js": ["nodejs", "node", "node js"],
+    "react": ["reactjs", "react js", "react.js"],
+    "angular": ["angularjs", "angular js"],
+    "vue": ["vuejs", "vue js", "vue.js"],
+    "graphql": [],
+    "rest": ["rest api", "rest apis", "restful", "restful apis", "restful services"],
+    "grpc": [],
+    "microservices": ["micro services", "microservice architecture"],
+    # Machine learning
+    "machine learning": ["ml"],
+    "deep learning": [],
+    "pytorch": ["torch"],
+    "tensorflow": [],
+    "scikit-learn": ["sklearn", "scikit learn"],
+    "pandas": [],
+    "numpy": [],
+    "nlp": ["natural language processing"],
+    "llm": ["llms", "large language models"],
+    # Practices
+    "distributed systems": ["distributed computing"],
+    "system design": ["software architecture", "data architecture"],
+    "design patterns": [],
+    "object-oriented programming": ["oop", "object oriented programming", "object oriented design", "ood"],
+    "test-driven development": ["tdd", "test driven development"],
+    "agile": ["scrum", "kanban"],
+    "monitoring": ["observability", "alerting"],
+    "prometheus": [],
+    "grafana": [],
+    "metabase": [],
+    "tableau": [],
+    "power bi": ["powerbi"],
+    # Soft skills
+    "communication": ["communication skills", "verbal communication", "written communication"],
+    "leadership": ["team leadership", "people management"],
+    "project management": [],
+}
+
+# Aliases that are also common words or single letters ("Go-to-market", "R&D",
+# "REST of stack"), so they only match a whole skill name, never inside a phrase
+EXACT_ONLY_ALIASES = {"go", "r", "c", "rest", "lambda", "node", "shell"}
+
+# Requirement weights: a missing must-have costs twice as much as a missing nice-to-have
+REQUIRED_WEIGHT = 1.0
+PREFERRED_WEIGHT = 0.5
+
+# Phrase wording between skill names, e.g. "Java or Scala", "AWS/GCP"
+NON_WORD = re.compile(r"[^a-z0-9+#.]+")
+
+def normalize_skill(name: str) -> str:
+    """Normalize a skill name to the form aliases are looked up by"""
+    text = NON_WORD.sub(" ", (name or "").lower())
+    # Keep dots inside names (node.js) but not at word edges
+    return " ".join(token.strip(".") for token in text.split() if token.strip("."))
+
+class SkillTaxonomy:
+    """Canonical skills looked up by exact alias through a hash map, or found inside phrases with a trie
+
+    Aliases in EXACT_ONLY_ALIASES are left out of the trie, so they only
+    match when they are the whole name.
+    """
+
+    END = ""
+    # Resolved names remembered per taxonomy, since the same skills recur across candidates
+    MAX_RESOLVED = 100000
+
+    def __init__(self, aliases: Dict[str, List[str]]):
+        self.lookup: Dict[str, str] = {}
+        self.trie: Dict[str, dict] = {}
+        self._resolved: Dict[str, Tuple[Set[str], bool]] = {}
+        for canonical, names in aliases.items():
+            for name in [canonical, *names]:
+                key = normalize_skill(name)
+                if not key:
+                    continue
+                self.lookup[key] = canonical
+                if key in EXACT_ONLY_ALIASES:
+                    continue
+                node = self.trie
+                for token in key.split():
+                    node = node.setdefault(token, {})
+                node[self.END] = canonical
+
+    def find(self, text: str) -> List[str]:
+        """Find the canonical skills named in a phrase, taking the longest alias at each position"""
+        tokens = normalize_skill(text).split()
+        found = []
+        i = 0
+        while i < len(tokens):
+            node, match, end = self.trie, None, i
+            for j in range(i, len(tokens)):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if self.END in node:
+                    match, end = node[self.END], j + 1
+            if match is None:
+                i += 1
+                continue
+            if match not in found:
+                found.append(match)
+            i = end
+        return found
+
+    def resolve(self, name: str) -> Tuple[Set[str], bool]:
+        """Get the canonical skills a skill name or requirement refers to, and whether any are known
+
+        An exact alias wins; otherwise known skills inside the phrase are used.
+        An unknown name stands for itself, so it still matches the same name.
+        """
+        resolved = self._resolved.get(name)
+        if resolved is not None:
+            return resolved
+        key = normalize_skill(name)
+        if key in self.lookup:
+            resolved = {self.lookup[key]}, True
+        else:
+            found = self.find(name)
+            resolved = (set(found), True) if found else (({key} if key else set()), False)
+        if len(self._resolved) >= self.MAX_RESOLVED:
+            self._resolved.clear()
+        self._resolved[name] = resolved
+        return resolved
+
+class SkillMatch(BaseModel):
+    """Skills coverage of a candidate against a job's requirements"""
+    score: float = Field(description="Weighted share of the requirements the candidate covers (0-1)")
+    matched: List[str] = Field(description="Requirements the candidate's skills cover")
+    missing_required: List[str] = Field(description="Must-have requirements the candidate's skills do not cover")
+    missing_preferred: List[str] = Field(description="Nice-to-have requirements the candidate's skills do not cover")
+
+    def gaps(self) -> List[str]:
+        """Describe the missing skills as match analysis gaps"""
+        return ([f"Missing required skill: {name}" for name in self.missing_required]
+                + [f"Missing preferred skill: {name}" for name in self.missing_preferred])
+
+    def to_prompt(self) -> str:
+        """Render the coverage as compact lines for prompts"""
+        return "\n".join([
+            f"Skills match (computed): {self.score:.2f}",
+            f"Matched requirements: {', '.join(self.matched) or 'None'}",
+            f"Missing must-have skills: {', '.join(self.missing_required) or 'None'}",
+            f"Missing nice-to-have skills: {', '.join(self.missing_preferred) or 'None'}",
+        ])
+
+def score_skill_matrix(taxonomy: SkillTaxonomy,
+                       candidates: Sequence[Iterable[str]],
+                       required: Sequence[str],
+                       preferred: Sequence[str] = ()) -> Dict[str, np.ndarray]:
+    """Score many candidates' skills against one set of requirements at once
+
+    Requirements and skills are resolved to canonical skills; a requirement
+    naming several (e.g. "Java or Scala") is covered by any of them. Coverage is
+    a candidates x requirements product of two 0/1 matrices over the canonical
+    skills the requirements name. A requirement nothing in the taxonomy
+    recognizes still counts, and is only covered by a candidate who lists it
+    by the same name, so it is reported missing rather than ignored.
+
+    Returns per-candidate "score" (NaN when the taxonomy recognizes none of
+    the requirements, leaving skills to the model), the "covered" candidates x
+    requirements mask, and the requirement "weights".
+    """
+    requirements = list(required) + list(preferred)
+    weights = np.array(
+        [REQUIRED_WEIGHT] * len(required) + [PREFERRED_WEIGHT] * len(preferred), dtype=np.float64
+    )
+    resolved = [taxonomy.resolve(requirement) for requirement in requirements]
+    vocabulary = {}
+    for names, _ in resolved:
+        for name in names:
+            vocabulary.setdefault(name, len(vocabulary))
+    known = np.array([is_known for _, is_known in resolved], dtype=bool)
+
+    satisfies = np.zeros((len(vocabulary), len(requirements)), dtype=np.float32)
+    for column, (names, _) in enumerate(resolved):
+        for name in names:
+            satisfies[vocabulary[name], column] = 1.0
+
+    has = np.zeros((len(candidates), len(vocabulary)), dtype=np.float32)
+    for row, skills in enumerate(candidates):
+        for skill in skills:
+            for name in taxonomy.resolve(skill)[0]:
+                column = vocabulary.get(name)
+                if column is not None:
+                    has[row, column] = 1.0
+
+    covered = (has @ satisfies) > 0
+    total = weights.sum()
+    if not known.any() or total <= 0:
+        score = np.full(len(candidates), np.nan)
+    else:
+        score = (covered * weights).sum(axis=1) / total
+    return {"score": score, "covered": covered, "weights": weights}
+
+def match_skills(taxonomy: SkillTaxonomy,
+                 skills: Iterable[str],
+                 required: Sequence[str],
+                 preferred: Sequence[str] = ()) -> Optional[SkillMatch]:
+    """Match one candidate's skills against the requirements, or None if no requirement is recognized"""
+    result = score_skill_matrix(taxonomy, [list(skills)], required, preferred)
+    if np.isnan(result["score"][0]):
+        return None
+    covered = result["covered"][0]
+    requirements = list(required) + list(preferred)
+    return SkillMatch(
+        score=round(float(result["score"][0]), 3),
+        matched=[name for name, hit in zip(requirements, covered) if hit],
+        missing_required=[name for name, hit in zip(required, covered) if not hit],
+        missing_preferred=[name for name, hit in zip(preferred, covered[len(required):]) if not hit],
+    )
+
+def load_skill_aliases(path: Optional[str] = None) -> Dict[str, List[str]]:
+    """Get the built-in aliases, extended by a JSON file of {canonical: [aliases]} if one is given"""
+    aliases = {canonical: list(names) for canonical, names in DEFAULT_SKILL_ALIASES.items()}
+    if path:
+        with open(path, "r") as f:
+            extra = json.load(f)
+        if not isinstance(extra, dict):
+            raise ValueError(f"Skill taxonomy file {path} must map canonical names to lists of aliases")
+        for canonical, names in extra.items():
+            aliases.setdefault(canonical.lower(), []).extend(names)
+    return aliases
+
+@functools.lru_cache(maxsize=4)
+def _build_taxonomy(path: Optional[str]) -> SkillTaxonomy:
+    """Build the taxonomy for an aliases file once"""
+    return SkillTaxonomy(load_skill_aliases(path))
+
+def get_skill_taxonomy() -> SkillTaxonomy:
+    """Get the shared skill taxonomy, built from SKILL_TAXONOMY_PATH if set"""
+    return _build_taxonomy(os.getenv("SKILL_TAXONOMY_PATH") or None)
+
+def deterministic_skills_enabled() -> bool:
+    """Check whether skills_match and missing-skill gaps are computed locally instead of by the model"""
+    return os.getenv("DETERMINISTIC_SKILLS_ENABLED", "true").lower() == "true"
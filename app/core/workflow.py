@@ -1,24 +1,48 @@
 """LangGraph workflow for the AI Resume Reviewer"""
-from typing import Dict, Any, List, TypedDict, Annotated
+from typing import Dict, Any, List, Optional, TypedDict, Annotated
+import asyncio
 import os
-from langgraph.graph import StateGraph, END
+import time
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import StateGraph, START, END
 from langsmith import traceable
-from app.agents.extractors import ExperienceExtractor, EducationExtractor, SkillsExtractor
-from app.agents.extractors import Experience, Education, Skill
+from app.agents.extractors import ExperienceExtractor, EducationExtractor, SkillsExtractor, JobProfileExtractor
+from app.agents.extractors import CombinedExtractor
+from app.agents.extractors import Experience, Education, Skill, JobProfile
 from app.agents.analyzers import MatchAnalyzer, ScoreGenerator, MatchAnalysis, ReviewResult
+from app.core.cache import content_hash
+from app.core.invocation import ModelUnavailableError
+from app.core.metrics import NODE_LATENCY, SECTION_FALLBACKS
+from app.core.registry import get_agents, get_extraction_cache
+from app.core.sections import route_resume, section_routing_enabled
+from app.core.skills import SkillMatch, deterministic_skills_enabled, get_skill_taxonomy, match_skills
 from app.utils.logger import setup_logging
 
 # Set up logger
 logger = setup_logging()
 
+# Extraction modes: "parallel" fans the extractors out as concurrent graph
+# branches, "sequential" runs them one after another in a single node and
+# "fused" asks for all sections in a single model call
+EXTRACTION_MODES = ("parallel", "sequential", "fused")
+
+# Resume sections the extractors fill in
+EXTRACTED_SECTIONS = ("experiences", "education", "skills")
+
+# Nodes that only join parallel branches; they output nothing worth reporting
+JOIN_NODES = frozenset({"check_extraction"})
+
 # Define the state structure
 class ResumeReviewState(TypedDict):
     resume: str
     job_description: str
+    job_profile: Annotated[Optional[JobProfile], "Requirements profile distilled from the job description"]
     experiences: Annotated[List[Experience], "Extracted work experiences"]
     education: Annotated[List[Education], "Extracted education"]
     skills: Annotated[List[Skill], "Extracted skills"]
+    skill_match: Annotated[Optional[SkillMatch], "Skills coverage computed locally against the job profile"]
     match_analysis: Annotated[MatchAnalysis, "Analysis of match between resume and job"]
+    review_result: Annotated[ReviewResult, "Overall score and recommendations"]
 
 # Initialize the agent instances
 @traceable(name="setup_extractors", run_type="chain")
@@ -28,70 +52,552 @@ def setup_extractors():
     education_extractor = EducationExtractor()
     skills_extractor = SkillsExtractor()
     match_analyzer = MatchAnalyzer()
+    score_generator = ScoreGenerator()
+    job_profile_extractor = JobProfileExtractor()
+    combined_extractor = CombinedExtractor()
     
     return {
+        "combined_extractor": combined_extractor,
+        "job_profile_extractor": job_profile_extractor,
         "experience_extractor": experience_extractor,
         "education_extractor": education_extractor,
         "skills_extractor": skills_extractor,
-        "match_analyzer": match_analyzer
+        "match_analyzer": match_analyzer,
+        "score_generator": score_generator
     }
 
+def get_extraction_mode() -> str:
+    """Get the configured extraction mode"""
+    mode = os.getenv("EXTRACTION_MODE", "parallel").lower()
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown EXTRACTION_MODE '{mode}', expected one of {EXTRACTION_MODES}")
+    return mode
+
+def get_score_floor() -> float:
+    """Get the mean match score below which recommendations are built without a model call"""
+    return float(os.getenv("SCORE_FLOOR", "0.25"))
+
+def job_profile_enabled() -> bool:
+    """Check whether downstream agents get a job profile instead of the raw job description"""
+    return os.getenv("JOB_PROFILE_ENABLED", "true").lower() == "true"
+
+def get_job_profile(job_description: str) -> Optional[JobProfile]:
+    """Get the requirements profile of a job description, extracting it on a cache miss"""
+    cache = get_extraction_cache()
+    key = content_hash(job_description)
+    cached = cache.get("job_profile", key)
+    if cached is not None:
+        return JobProfile(**cached)
+    
+    try:
+        profile = get_agents()["job_profile_extractor"].extract(job_description)
+    except Exception as e:
+        logger.error(f"Error extracting job profile: {str(e)}")
+        return None
+    
+    if profile is not None:
+        cache.set("job_profile", key, profile.model_dump())
+    return profile
+
+async def aget_job_profile(job_description: str) -> Optional[JobProfile]:
+    """Get the requirements profile of a job description asynchronously"""
+    # The cache blocks on SQLite, so it is read and written off the event loop
+    cache = await asyncio.to_thread(get_extraction_cache)
+    key = content_hash(job_description)
+    cached = await asyncio.to_thread(cache.get, "job_profile", key)
+    if cached is not None:
+        return JobProfile(**cached)
+    
+    try:
+        profile = await get_agents()["job_profile_extractor"].aextract(job_description)
+    except Exception as e:
+        logger.error(f"Error extracting job profile: {str(e)}")
+        return None
+    
+    if profile is not None:
+        await asyncio.to_thread(cache.set, "job_profile", key, profile.model_dump())
+    return profile
+
+def job_requirements(state: ResumeReviewState, include_skills: bool = True) -> str:
+    """Get the job requirements text given to downstream agents"""
+    profile = state.get("job_profile")
+    if profile is not None:
+        return profile.to_prompt(include_skills)
+    return state["job_description"]
+
+def compute_skill_match(state: ResumeReviewState) -> Optional[SkillMatch]:
+    """Match the candidate's skills against the job profile locally, or None to leave it to the model"""
+    profile = state.get("job_profile")
+    if profile is None or not deterministic_skills_enabled():
+        return None
+    names = [skill.name for skill in state.get("skills") or []]
+    names += [name for experience in state.get("experiences") or [] for name in experience.skills_used]
+    return match_skills(get_skill_taxonomy(), names, profile.must_have_skills, profile.nice_to_have_skills)
+
+@traceable(name="profile_job", run_type="chain")
+def profile_job(state: ResumeReviewState) -> Dict[str, Any]:
+    """Distill the job description into a requirements profile"""
+    if state.get("job_profile") is not None or not job_profile_enabled():
+        return {}
+    logger.info("Profiling job description")
+    return {"job_profile": get_job_profile(state["job_description"])}
+
+@traceable(name="profile_job", run_type="chain")
+async def aprofile_job(state: ResumeReviewState) -> Dict[str, Any]:
+    """Distill the job description into a requirements profile asynchronously"""
+    if state.get("job_profile") is not None or not job_profile_enabled():
+        return {}
+    logger.info("Profiling job description")
+    return {"job_profile": await aget_job_profile(state["job_description"])}
+
+def resume_for(name: str, state: ResumeReviewState) -> str:
+    """Get the sections of the resume an extraction needs, or all of it when segmentation is unsure"""
+    text, sliced = route_resume(state["resume"], name)
+    if section_routing_enabled() and not sliced:
+        logger.info(f"Sending the full resume to the {name} extractor")
+        SECTION_FALLBACKS.inc(extraction=name)
+    return text
+
+def _cache_key(name: str, state: ResumeReviewState) -> str:
+    """Get the cache key for an extraction; only skills depend on the job description"""
+    if name == "skills":
+        return content_hash(state["resume"], state["job_description"])
+    return content_hash(state["resume"])
+
+def _safe_extract(name: str, model, state: ResumeReviewState, func, *args) -> list:
+    """Run a single extractor through the cache, returning an empty list if it fails"""
+    cache = get_extraction_cache()
+    key = _cache_key(name, state)
+    cached = cache.get_models(name, key, model)
+    if cached is not None:
+        logger.info(f"Using cached {name}")
+        return cached
+    
+    try:
+        items = func(*args)
+    except ModelUnavailableError:
+        # Fail the review rather than analyze a profile missing a section
+        raise
+    except Exception as e:
+        logger.error(f"Error extracting {name}: {str(e)}")
+        return []
+    
+    # Empty results are usually failures, so leave them to be retried
+    if items:
+        cache.set_models(name, key, items)
+    return items
+
+async def _asafe_extract(name: str, model, state: ResumeReviewState, func, *args) -> list:
+    """Run a single async extractor through the cache, returning an empty list if it fails"""
+    cache = await asyncio.to_thread(get_extraction_cache)
+    key = _cache_key(name, state)
+    cached = await asyncio.to_thread(cache.get_models, name, key, model)
+    if cached is not None:
+        logger.info(f"Using cached {name}")
+        return cached
+    
+    try:
+        items = await func(*args)
+    except ModelUnavailableError:
+        # Fail the review rather than analyze a profile missing a section
+        raise
+    except Exception as e:
+        logger.error(f"Error extracting {name}: {str(e)}")
+        return []
+    
+    # Empty results are usually failures, so leave them to be retried
+    if items:
+        await asyncio.to_thread(cache.set_models, name, key, items)
+    return items
+
+@traceable(name="extract_experience", run_type="chain")
+def extract_experience(state: ResumeReviewState) -> Dict[str, Any]:
+    """Extract work experience from the resume"""
+    logger.info("Extracting experience")
+    agents = get_agents()
+    experiences = _safe_extract(
+        "experiences",
+        Experience,
+        state,
+        agents["experience_extractor"].extract,
+        resume_for("experiences", state)
+    )
+    return {"experiences": experiences}
+
+@traceable(name="extract_experience", run_type="chain")
+async def aextract_experience(state: ResumeReviewState) -> Dict[str, Any]:
+    """Extract work experience from the resume asynchronously"""
+    logger.info("Extracting experience")
+    agents = get_agents()
+    experiences = await _asafe_extract(
+        "experiences",
+        Experience,
+        state,
+        agents["experience_extractor"].aextract,
+        resume_for("experiences", state)
+    )
+    return {"experiences": experiences}
+
+@traceable(name="extract_education", run_type="chain")
+def extract_education(state: ResumeReviewState) -> Dict[str, Any]:
+    """Extract education from the resume"""
+    logger.info("Extracting education")
+    agents = get_agents()
+    education = _safe_extract(
+        "education",
+        Education,
+        state,
+        agents["education_extractor"].extract,
+        resume_for("education", state)
+    )
+    return {"education": education}
+
+@traceable(name="extract_education", run_type="chain")
+async def aextract_education(state: ResumeReviewState) -> Dict[str, Any]:
+    """Extract education from the resume asynchronously"""
+    logger.info("Extracting education")
+    agents = get_agents()
+    education = await _asafe_extract(
+        "education",
+        Education,
+        state,
+        agents["education_extractor"].aextract,
+        resume_for("education", state)
+    )
+    return {"education": education}
+
+@traceable(name="extract_skills", run_type="chain")
+def extract_skills(state: ResumeReviewState) -> Dict[str, Any]:
+    """Extract skills from the resume"""
+    logger.info("Extracting skills")
+    agents = get_agents()
+    skills = _safe_extract(
+        "skills",
+        Skill,
+        state,
+        agents["skills_extractor"].extract,
+        resume_for("skills", state),
+        job_requirements(state)
+    )
+    return {"skills": skills}
+
+@traceable(name="extract_skills", run_type="chain")
+async def aextract_skills(state: ResumeReviewState) -> Dict[str, Any]:
+    """Extract skills from the resume asynchronously"""
+    logger.info("Extracting skills")
+    agents = get_agents()
+    skills = await _asafe_extract(
+        "skills",
+        Skill,
+        state,
+        agents["skills_extractor"].aextract,
+        resume_for("skills", state),
+        job_requirements(state)
+    )
+    return {"skills": skills}
+
 # Define the combined extraction function
 @traceable(name="extract", run_type="chain")
 def extract(state: ResumeReviewState) -> Dict[str, Any]:
     """Extract all information from resume: experience, education, and skills"""
     logger.info("Extracting all resume information")
-    agents = setup_extractors()
-    
-    # Extract all information
-    experiences = agents["experience_extractor"].extract(state["resume"])
-    education = agents["education_extractor"].extract(state["resume"])
-    skills = agents["skills_extractor"].extract(
-        state["resume"], 
-        state["job_description"]
-    )
+    result = {}
+    result.update(extract_experience(state))
+    result.update(extract_education(state))
+    result.update(extract_skills(state))
+    return result
+
+@traceable(name="extract", run_type="chain")
+async def aextract(state: ResumeReviewState) -> Dict[str, Any]:
+    """Extract all information from resume asynchronously, one extractor at a time"""
+    logger.info("Extracting all resume information")
+    result = {}
+    result.update(await aextract_experience(state))
+    result.update(await aextract_education(state))
+    result.update(await aextract_skills(state))
+    return result
+
+def _cached_sections(state: ResumeReviewState) -> Dict[str, Any]:
+    """Get the sections of a fused extraction that are already cached"""
+    cache = get_extraction_cache()
+    result = {}
+    for name, model in CombinedExtractor.SECTIONS.items():
+        cached = cache.get_models(name, _cache_key(name, state), model)
+        if cached is not None:
+            result[name] = cached
+    return result
+
+def _store_sections(state: ResumeReviewState, sections: Dict[str, Any], missing: List[str]) -> Dict[str, Any]:
+    """Cache the valid sections of a fused extraction and return them"""
+    cache = get_extraction_cache()
+    result = {}
+    for name in missing:
+        items = sections.get(name)
+        if items is None:
+            continue
+        if items:
+            cache.set_models(name, _cache_key(name, state), items)
+        result[name] = items
+    return result
+
+@traceable(name="extract_fused", run_type="chain")
+def extract_fused(state: ResumeReviewState) -> Dict[str, Any]:
+    """Extract all information from resume in one model call, re-asking only failed sections"""
+    logger.info("Extracting all resume information in one call")
+    result = _cached_sections(state)
+    missing = [name for name in CombinedExtractor.SECTIONS if name not in result]
+    if not missing:
+        return result
     
-    return {
-        "experiences": experiences,
-        "education": education,
-        "skills": skills
+    try:
+        sections = get_agents()["combined_extractor"].extract(state["resume"], job_requirements(state))
+    except ModelUnavailableError:
+        raise
+    except Exception as e:
+        logger.error(f"Error in combined extraction: {str(e)}")
+        sections = {}
+    result.update(_store_sections(state, sections, missing))
+    
+    # Fall back to the dedicated extractor for each section that failed validation
+    section_nodes = {
+        "experiences": extract_experience,
+        "education": extract_education,
+        "skills": extract_skills,
+    }
+    for name in missing:
+        if name not in result:
+            logger.info(f"Re-asking {name} after combined extraction failed")
+            result.update(section_nodes[name](state))
+    return result
+
+@traceable(name="extract_fused", run_type="chain")
+async def aextract_fused(state: ResumeReviewState) -> Dict[str, Any]:
+    """Extract all information from resume in one model call asynchronously, re-asking only failed sections"""
+    logger.info("Extracting all resume information in one call")
+    result = await asyncio.to_thread(_cached_sections, state)
+    missing = [name for name in CombinedExtractor.SECTIONS if name not in result]
+    if not missing:
+        return result
+    
+    try:
+        sections = await get_agents()["combined_extractor"].aextract(state["resume"], job_requirements(state))
+    except ModelUnavailableError:
+        raise
+    except Exception as e:
+        logger.error(f"Error in combined extraction: {str(e)}")
+        sections = {}
+    result.update(await asyncio.to_thread(_store_sections, state, sections, missing))
+    
+    # Fall back to the dedicated extractors, concurrently, for sections that failed validation
+    section_nodes = {
+        "experiences": aextract_experience,
+        "education": aextract_education,
+        "skills": aextract_skills,
     }
+    retries = [name for name in missing if name not in result]
+    for name in retries:
+        logger.info(f"Re-asking {name} after combined extraction failed")
+    for update in await asyncio.gather(*(section_nodes[name](state) for name in retries)):
+        result.update(update)
+    return result
 
 @traceable(name="analyze_match", run_type="chain")
 def analyze_match(state: ResumeReviewState) -> Dict[str, Any]:
     """Analyze match between resume and job description"""
     logger.info("Analyzing match")
     
-    # Wait for all extractions to complete
-    if not state.get("experiences") or not state.get("education") or not state.get("skills"):
-        logger.error("Extraction steps not completed")
+    # A missing section is analyzed as absent; only an empty extraction has nothing to analyze
+    if nothing_extracted(state):
+        logger.error("Nothing extracted from the resume")
         return {}
     
-    agents = setup_extractors()
+    # Skills are scored locally when the job profile's requirements are recognized
+    skill_match = compute_skill_match(state)
+    agents = get_agents()
     match_analysis = agents["match_analyzer"].analyze(
-        state["job_description"],
-        state["experiences"],
-        state["education"],
-        state["skills"]
+        job_requirements(state, include_skills=skill_match is None),
+        state.get("experiences") or [],
+        state.get("education") or [],
+        state.get("skills") or [],
+        skill_match
+    )
+    
+    return {"match_analysis": match_analysis, "skill_match": skill_match}
+
+@traceable(name="analyze_match", run_type="chain")
+async def aanalyze_match(state: ResumeReviewState) -> Dict[str, Any]:
+    """Analyze match between resume and job description asynchronously"""
+    logger.info("Analyzing match")
+    
+    # A missing section is analyzed as absent; only an empty extraction has nothing to analyze
+    if nothing_extracted(state):
+        logger.error("Nothing extracted from the resume")
+        return {}
+    
+    # Skills are scored locally when the job profile's requirements are recognized
+    skill_match = compute_skill_match(state)
+    agents = get_agents()
+    match_analysis = await agents["match_analyzer"].aanalyze(
+        job_requirements(state, include_skills=skill_match is None),
+        state.get("experiences") or [],
+        state.get("education") or [],
+        state.get("skills") or [],
+        skill_match
+    )
+    
+    return {"match_analysis": match_analysis, "skill_match": skill_match}
+
+def mean_match_score(match_analysis: MatchAnalysis) -> float:
+    """Get the mean of the experience, education and skills match scores"""
+    return (match_analysis.experience_match
+            + match_analysis.education_match
+            + match_analysis.skills_match) / 3
+
+@traceable(name="generate_score", run_type="chain")
+def generate_score(state: ResumeReviewState) -> Dict[str, Any]:
+    """Generate the overall score and recommendations"""
+    logger.info("Generating score")
+    review_result = get_agents()["score_generator"].generate(
+        job_requirements(state),
+        state["match_analysis"]
+    )
+    return {"review_result": review_result}
+
+@traceable(name="generate_score", run_type="chain")
+async def agenerate_score(state: ResumeReviewState) -> Dict[str, Any]:
+    """Generate the overall score and recommendations asynchronously"""
+    logger.info("Generating score")
+    review_result = await get_agents()["score_generator"].agenerate(
+        job_requirements(state),
+        state["match_analysis"]
     )
+    return {"review_result": review_result}
+
+@traceable(name="score_low_fit", run_type="chain")
+def score_low_fit(state: ResumeReviewState) -> Dict[str, Any]:
+    """Build the review result from the match analysis alone for a candidate below the score floor"""
+    logger.info("Match below score floor, skipping score generation")
+    match_analysis = state["match_analysis"]
+    review_result = ReviewResult(
+        overall_score=mean_match_score(match_analysis),
+        match_details=match_analysis,
+        recommendations=[f"Address the gap: {gap}" for gap in match_analysis.gaps],
+        key_talking_points=list(match_analysis.strengths)
+    )
+    return {"review_result": review_result}
+
+async def ascore_low_fit(state: ResumeReviewState) -> Dict[str, Any]:
+    """Build the review result for a low-fit candidate; no model call is made"""
+    return score_low_fit(state)
+
+def check_extraction(state: ResumeReviewState) -> Dict[str, Any]:
+    """Join the parallel extraction branches before routing"""
+    return {}
+
+async def acheck_extraction(state: ResumeReviewState) -> Dict[str, Any]:
+    """Join the parallel extraction branches before routing"""
+    return {}
+
+def nothing_extracted(state: ResumeReviewState) -> bool:
+    """Check whether extraction found no experience, education or skills at all"""
+    return not any(state.get(name) for name in EXTRACTED_SECTIONS)
+
+def route_after_extraction(state: ResumeReviewState) -> str:
+    """Skip the match analysis when nothing could be extracted from the resume"""
+    if nothing_extracted(state):
+        logger.error("Skipping match analysis, nothing extracted from the resume")
+        return END
+    missing = [name for name in EXTRACTED_SECTIONS if not state.get(name)]
+    if missing:
+        logger.warning(f"Analyzing match without: {', '.join(missing)}")
+    return "analyze_match"
+
+def route_after_analysis(state: ResumeReviewState) -> str:
+    """Send low-fit candidates past the score generator"""
+    match_analysis = state.get("match_analysis")
+    if match_analysis is None:
+        return END
+    if mean_match_score(match_analysis) < get_score_floor():
+        return "score_low_fit"
+    return "generate_score"
+
+def _timed(func, afunc):
+    """Record each call's latency under the node's name"""
+    name = func.__name__
+    
+    def finished(start: float):
+        elapsed = time.perf_counter() - start
+        NODE_LATENCY.observe(elapsed, node=name)
+        logger.debug(f"Finished {name}", extra={"node": name, "duration_ms": round(elapsed * 1000, 1)})
     
-    return {"match_analysis": match_analysis}
+    def timed(state):
+        start = time.perf_counter()
+        try:
+            return func(state)
+        finally:
+            finished(start)
+    
+    async def atimed(state):
+        start = time.perf_counter()
+        try:
+            return await afunc(state)
+        finally:
+            finished(start)
+    
+    return timed, atimed
+
+def _node(func, afunc):
+    """Wrap sync and async implementations so the graph supports invoke and ainvoke"""
+    timed, atimed = _timed(func, afunc)
+    return RunnableLambda(timed, afunc=atimed, name=func.__name__)
 
-def create_resume_review_graph():
+def create_resume_review_graph(extraction_mode: str = None):
     """Create the LangGraph workflow for resume review"""
+    mode = extraction_mode or get_extraction_mode()
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode '{mode}', expected one of {EXTRACTION_MODES}")
+
     # Create a new graph
     graph = StateGraph(ResumeReviewState)
+    graph.add_node("profile_job", _node(profile_job, aprofile_job))
+    graph.add_node("analyze_match", _node(analyze_match, aanalyze_match))
+    graph.add_node("generate_score", _node(generate_score, agenerate_score))
+    graph.add_node("score_low_fit", _node(score_low_fit, ascore_low_fit))
+    graph.add_edge(START, "profile_job")
     
-    # Add nodes to the graph for each step
-    graph.add_node("extract", extract)
-    graph.add_node("analyze_match", analyze_match)
-    
-    # Set up the flow - extraction followed by analysis
-    graph.add_edge("extract", "analyze_match")
-    graph.add_edge("analyze_match", END)
+    if mode == "parallel":
+        # Fan the extractors out as parallel branches that join before analysis.
+        # Skills are scored against the job profile, so they wait for it.
+        graph.add_node("extract_experience", _node(extract_experience, aextract_experience))
+        graph.add_node("extract_education", _node(extract_education, aextract_education))
+        graph.add_node("extract_skills", _node(extract_skills, aextract_skills))
+        graph.add_node("check_extraction", _node(check_extraction, acheck_extraction))
+        graph.add_edge(START, "extract_experience")
+        graph.add_edge(START, "extract_education")
+        graph.add_edge("profile_job", "extract_skills")
+        graph.add_edge(
+            ["extract_experience", "extract_education", "extract_skills"],
+            "check_extraction"
+        )
+        extraction_node = "check_extraction"
+    elif mode == "fused":
+        # One combined extraction call, after the job profile it scores skills against
+        graph.add_node("extract_fused", _node(extract_fused, aextract_fused))
+        graph.add_edge("profile_job", "extract_fused")
+        extraction_node = "extract_fused"
+    else:
+        # All extractions in a single step
+        graph.add_node("extract", _node(extract, aextract))
+        graph.add_edge("profile_job", "extract")
+        extraction_node = "extract"
     
-    # Set the entry point - start with extraction
-    graph.set_entry_point("extract")
+    # Skip calls that cannot change the outcome: the graph ends before analysis
+    # only when every section came back empty (partial extractions are still
+    # analyzed), and no recommendations are generated below the score floor
+    graph.add_conditional_edges(extraction_node, route_after_extraction, ["analyze_match", END])
+    graph.add_conditional_edges("analyze_match", route_after_analysis, ["generate_score", "score_low_fit", END])
+    graph.add_edge("generate_score", END)
+    graph.add_edge("score_low_fit", END)
     
     # Compile the graph
-    return graph.compile() 
\ No newline at end of file
+    return graph.compile()
@@ -1,21 +1,183 @@
 """Logger utility for the AI Resume Reviewer"""
+import atexit
+import contextvars
+import copy
+import hashlib
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator, Optional
 
-def setup_logging(log_level=logging.INFO):
-    """Setup logging configuration"""
+# Review the current code is working on, attached to every record logged for it
+correlation_id = contextvars.ContextVar("correlation_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through extra
+STANDARD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "correlation_id", "correlation_tag"}
+
+# Set up once per process by setup_logging
+_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+
+def new_correlation_id() -> str:
+    """Generate a correlation ID"""
+    return uuid.uuid4().hex[:16]
+
+def get_correlation_id() -> Optional[str]:
+    """Get the correlation ID of the review being worked on, if any"""
+    return correlation_id.get()
+
+@contextmanager
+def correlation_scope(value: Optional[str] = None) -> Iterator[str]:
+    """Tag everything logged in the block, including by tasks and threads it starts, with a correlation ID"""
+    value = value or new_correlation_id()
+    token = correlation_id.set(value)
+    try:
+        yield value
+    finally:
+        correlation_id.reset(token)
+
+class CorrelationFilter(logging.Filter):
+    """Stamp records with the correlation ID of the code that logged them"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep only a share of debug records, deciding per review so a kept review's debug trail is complete"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        if not 0 <= rate <= 1:
+            raise ValueError("LOG_DEBUG_SAMPLE_RATE must be between 0 and 1")
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        value = getattr(record, "correlation_id", None)
+        if value is None:
+            return random.random() < self.rate
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2 ** 64 < self.rate
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hand records to the listener thread, dropping them rather than blocking when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message and traceback now, since the arguments may change before the listener formats them
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Format records as readable lines, with the correlation ID when there is one"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(correlation_tag)s%(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        value = getattr(record, "correlation_id", None)
+        record.correlation_tag = f"[{value}] " if value else ""
+        return super().format(record)
+
+def get_log_level() -> int:
+    """Get the configured log level"""
+    name = os.getenv("LOG_LEVEL", "INFO").upper()
+    level = logging.getLevelName(name)
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown LOG_LEVEL '{name}'")
+    return level
+
+def get_dropped_records() -> int:
+    """Get how many records were dropped because the log queue was full"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+def setup_logging(log_level=None):
+    """Setup logging configuration
+
+    The first call routes the app's records through a queue to a background
+    thread that formats and writes them, so logging never blocks on stdout.
+    Later calls return the same logger, changing only the level if one is given.
+    """
+    global _listener, _queue_handler
     logger = logging.getLogger("resume_reviewer")
-    logger.setLevel(log_level)
-    
-    # Create a handler for console output
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setLevel(log_level)
-    
-    # Format logs
-    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    handler.setFormatter(formatter)
-    
-    # Add handler to logger
-    logger.addHandler(handler)
-    
-    return logger 
\ No newline at end of file
+    with _lock:
+        if _listener is not None:
+            if log_level is not None:
+                logger.setLevel(log_level)
+            return logger
+
+        # Format logs
+        log_format = os.getenv("LOG_FORMAT", "json").lower()
+        if log_format not in ("json", "text"):
+            raise ValueError(f"Unknown LOG_FORMAT '{log_format}', expected json or text")
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JSONFormatter() if log_format == "json" else TextFormatter())
+
+        # Records are stamped and sampled on the calling thread, where the correlation ID is set
+        _queue_handler = NonBlockingQueueHandler(queue.Queue(int(os.getenv("LOG_QUEUE_SIZE", "10000"))))
+        _queue_handler.addFilter(CorrelationFilter())
+        _queue_handler.addFilter(DebugSamplingFilter(float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.01"))))
+
+        logger.setLevel(log_level if log_level is not None else get_log_level())
+        logger.addHandler(_queue_handler)
+        logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(_queue_handler.queue, handler)
+        _listener.start()
+        # Write out whatever is still queued when the process exits
+        atexit.register(shutdown_logging)
+    return logger
+
+def shutdown_logging():
+    """Flush queued records and stop the background writer"""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        logging.getLogger("resume_reviewer").removeHandler(_queue_handler)
+        _listener = None
+        _queue_handler = None
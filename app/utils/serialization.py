@@ -0,0 +1,13 @@
+"""Serialization helpers for the AI Resume Reviewer"""
+from typing import Any
+from pydantic import BaseModel
+
+def to_jsonable(value: Any) -> Any:
+    """Convert workflow values, including pydantic models, to JSON-serializable data"""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    return value
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""Micro-benchmark: incremental JSON parser vs the regex extraction path
+
+Builds model-style responses from the recorded results in the repository
+(result.json, Old_result.json) and compares, for each response shape, how many
+items each parser recovers and how long a parse takes.
+
+Usage:
+    python benchmarks/bench_json_parser.py [--repeat N]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agents.extractors import Experience, Education, Skill
+from app.core.json_stream import IncrementalJSONParser, iter_items, parse_items
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def legacy_parse(text_content, item_model):
+    """The greedy regex path the extractors used before the incremental parser"""
+    items = []
+    try:
+        matches = re.search(r'(\[.*\])', text_content, re.DOTALL)
+        if matches:
+            for item_data in json.loads(matches.group(1)):
+                try:
+                    items.append(item_model(**item_data))
+                except Exception:
+                    pass
+    except Exception:
+        pass
+    return items
+
+def recorded_responses():
+    """Build response variants from the recorded extraction results"""
+    responses = []
+    for filename in ("result.json", "Old_result.json"):
+        with open(os.path.join(ROOT, filename)) as f:
+            recorded = json.load(f)
+        for key, model in (("experiences", Experience), ("education", Education), ("skills", Skill)):
+            payload = json.dumps(recorded[key], indent=2)
+            clean = f"Here is the extracted data:\n```json\n{payload}\n```"
+            responses.extend([
+                (f"{filename}:{key}:clean", clean, model),
+                (f"{filename}:{key}:trailing-prose", clean + "\nDates are approximate [see resume].", model),
+                (f"{filename}:{key}:truncated", clean[:int(len(clean) * 0.7)], model),
+                (f"{filename}:{key}:trailing-comma", clean.replace("}\n]", "},\n]"), model),
+            ])
+    return responses
+
+def chars_to_first_item(text, chunk_size=8):
+    """Characters the incremental parser consumes before it yields the first object"""
+    parser = IncrementalJSONParser()
+    for start in range(0, len(text), chunk_size):
+        if parser.feed(text[start:start + chunk_size]):
+            return start + chunk_size
+    return None
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--repeat", type=int, default=200, help="parses per timing sample")
+    args = arg_parser.parse_args()
+
+    print(f"{'response':<44} {'legacy':>7} {'new':>5} {'legacy us':>10} {'new us':>8} {'stream us':>10} {'first@':>10}")
+    totals = {"legacy": 0, "incremental": 0}
+    for name, text, model in recorded_responses():
+        legacy_items = legacy_parse(text, model)
+        incremental_items = parse_items(text, model)
+        legacy_time = timeit.timeit(lambda: legacy_parse(text, model), number=args.repeat) / args.repeat
+        incremental_time = timeit.timeit(lambda: parse_items(text, model), number=args.repeat) / args.repeat
+        chunks = [text[i:i + 8] for i in range(0, len(text), 8)]
+        stream_time = timeit.timeit(lambda: list(iter_items(chunks, model)), number=args.repeat) / args.repeat
+        first = chars_to_first_item(text)
+        totals["legacy"] += len(legacy_items)
+        totals["incremental"] += len(incremental_items)
+        print(f"{name:<44} {len(legacy_items):>7} {len(incremental_items):>5} "
+              f"{legacy_time * 1e6:>10.1f} {incremental_time * 1e6:>8.1f} {stream_time * 1e6:>10.1f} "
+              f"{(f'{first}/{len(text)}' if first else '-'):>10}")
+
+    print(f"\nItems recovered: legacy {totals['legacy']}, new {totals['incremental']}")
+    print("new: whole response; stream: same response fed in 8-character chunks;"
+          " first@: characters streamed before the first item is available")
+
+if __name__ == "__main__":
+    main()
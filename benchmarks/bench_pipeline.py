@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+"""Offline benchmark of the review pipeline's own overhead
+
+Runs every stage against the replay model (LLM_PROVIDER=stub), so no network
+or API keys are needed, and reports per-stage timings plus requests per second
+for the CLI path in main.py and the /review endpoint.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--iterations N] [--concurrency C]
+        [--latency-ms MS] [--jitter-ms MS] [--json OUT]
+        [--baseline BASELINE.json --tolerance 0.25]
+
+With --baseline, exits non-zero when any stage's mean time regresses by more
+than the tolerance, which is how CI catches performance regressions.
+"""
+import argparse
+import asyncio
+import atexit
+import importlib
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def configure_environment(args):
+    """Point the app at the replay model and throwaway stores before anything imports it
+
+    Review reuse and coalescing are off, so every request runs the pipeline
+    rather than being answered from an earlier review.
+    """
+    state_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    atexit.register(shutil.rmtree, state_dir, ignore_errors=True)
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["STUB_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["STUB_JITTER_MS"] = str(args.jitter_ms)
+    os.environ["STUB_SEED"] = "0"
+    os.environ["LANGSMITH_TRACING"] = "false"
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
+    os.environ["TOKEN_COUNTER"] = "approx"
+    os.environ["EXTRACTION_CACHE_ENABLED"] = "true" if args.cache else "false"
+    os.environ["EXTRACTION_CACHE_PATH"] = os.path.join(state_dir, "extractions.db")
+    os.environ["REVIEW_CACHE_ENABLED"] = "false"
+    os.environ["NEAR_DUPLICATE_ENABLED"] = "false"
+    os.environ["NEAR_DUPLICATE_INDEX_PATH"] = os.path.join(state_dir, "near_duplicates.db")
+    os.environ["REVIEW_COALESCING_ENABLED"] = "false"
+    os.environ["JOB_QUEUE_PATH"] = os.path.join(state_dir, "jobs.db")
+
+def summarize(samples):
+    """Summarize timing samples in milliseconds"""
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": samples[len(samples) // 2] * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+    }
+
+def time_calls(func, iterations):
+    """Time repeated calls of func"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def bench_stages(args, resume, job_description):
+    """Time the pipeline's fixed costs stage by stage"""
+    results = {}
+
+    start = time.perf_counter()
+    workflow = importlib.import_module("app.core.workflow")
+    results["import_workflow"] = summarize([time.perf_counter() - start])
+
+    from app.core.stub import load_replay_responses
+    from app.core.models import clear_model_cache
+
+    def build_agents():
+        clear_model_cache()
+        return workflow.setup_extractors()
+    results["agent_construction"] = summarize(time_calls(build_agents, args.iterations))
+    results["graph_compile"] = summarize(time_calls(workflow.create_resume_review_graph, args.iterations))
+
+    agents = workflow.setup_extractors()
+    score_generator = agents["score_generator"]
+    responses = load_replay_responses()
+    experiences = agents["experience_extractor"].parse(responses["experiences"])
+    education = agents["education_extractor"].parse(responses["education"])
+    skills = agents["skills_extractor"].parse(responses["skills"])
+    match_analysis = agents["match_analyzer"].parse(responses["match_analysis"])
+
+    def format_prompts():
+        agents["job_profile_extractor"].format_prompt(job_description)
+        agents["experience_extractor"].format_prompt(resume)
+        agents["education_extractor"].format_prompt(resume)
+        agents["skills_extractor"].format_prompt(resume, job_description)
+        agents["match_analyzer"].format_prompt(job_description, experiences, education, skills)
+        score_generator.format_prompt(job_description, match_analysis)
+    results["prompt_formatting"] = summarize(time_calls(format_prompts, args.iterations))
+
+    def parse_responses():
+        agents["job_profile_extractor"].parse(responses["job_profile"])
+        agents["experience_extractor"].parse(responses["experiences"])
+        agents["education_extractor"].parse(responses["education"])
+        agents["skills_extractor"].parse(responses["skills"])
+        agents["match_analyzer"].parse(responses["match_analysis"])
+        score_generator.parse(responses["review_result"], match_analysis)
+    results["response_parsing"] = summarize(time_calls(parse_responses, args.iterations))
+
+    # Deterministic skills scoring over a batch of candidates built from the recorded skills
+    from app.core.skills import get_skill_taxonomy, score_skill_matrix
+    profile = agents["job_profile_extractor"].parse(responses["job_profile"])
+    names = [skill.name for skill in skills]
+    candidates = [names[i % len(names):] + names[:i % len(names) // 2] for i in range(1000)]
+    taxonomy = get_skill_taxonomy()
+    results["skills_matching_1000"] = summarize(time_calls(
+        lambda: score_skill_matrix(taxonomy, candidates, profile.must_have_skills, profile.nice_to_have_skills),
+        args.iterations
+    ))
+
+    return results
+
+def bench_cli(args, resume, job_description):
+    """Time the CLI path: build the graph once, then invoke it like main.py"""
+    from app.core.workflow import create_resume_review_graph
+    graph = create_resume_review_graph()
+    inputs = {"resume": resume, "job_description": job_description}
+
+    start = time.perf_counter()
+    samples = time_calls(lambda: graph.invoke(inputs), args.iterations)
+    elapsed = time.perf_counter() - start
+
+    result = summarize(samples)
+    result["requests_per_second"] = args.iterations / elapsed
+    return result
+
+def bench_api(args, resume, job_description):
+    """Time concurrent POST /review requests against the ASGI app in process"""
+    import httpx
+    from app.api.main import app
+
+    async def run():
+        samples = []
+        statuses = {}
+        semaphore = asyncio.Semaphore(args.concurrency)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            async def one():
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/review", json={
+                        "resume": resume,
+                        "job_description": job_description
+                    })
+                    samples.append(time.perf_counter() - start)
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(args.iterations)))
+            elapsed = time.perf_counter() - start
+        return samples, statuses, elapsed
+
+    samples, statuses, elapsed = asyncio.run(run())
+    result = summarize(samples)
+    result["requests_per_second"] = args.iterations / elapsed
+    result["status_codes"] = {str(code): count for code, count in statuses.items()}
+    return result
+
+def compare(results, baseline, tolerance):
+    """List the stages whose mean time regressed beyond the tolerance"""
+    regressions = []
+    for section, stages in baseline.items():
+        for stage, stats in stages.items():
+            current = results.get(section, {}).get(stage)
+            if not current or "mean_ms" not in stats:
+                continue
+            if current["mean_ms"] > stats["mean_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{section}.{stage}: {current['mean_ms']:.2f} ms vs baseline {stats['mean_ms']:.2f} ms"
+                )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20, help="runs per stage")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent /review requests")
+    parser.add_argument("--latency-ms", type=float, default=0, help="synthetic latency per model call")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="uniform jitter around the latency")
+    parser.add_argument("--cache", action="store_true", help="keep the extraction cache enabled")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="fail when slower than the results in this file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    with open(os.path.join(ROOT, "Resume.txt")) as f:
+        resume = f.read()
+    with open(os.path.join(ROOT, "jd.txt")) as f:
+        job_description = f.read()
+
+    results = {
+        "stages": bench_stages(args, resume, job_description),
+        "cli": {"review": bench_cli(args, resume, job_description)},
+        "api": {"review": bench_api(args, resume, job_description)},
+    }
+
+    for section, stages in results.items():
+        for stage, stats in stages.items():
+            line = f"{section + '.' + stage:<30} mean {stats['mean_ms']:>9.2f} ms  p50 {stats['p50_ms']:>9.2f} ms  p95 {stats['p95_ms']:>9.2f} ms"
+            if "requests_per_second" in stats:
+                line += f"  {stats['requests_per_second']:>8.1f} req/s"
+            if "status_codes" in stats:
+                line += f"  status {stats['status_codes']}"
+            print(line)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
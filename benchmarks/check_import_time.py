@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""Check that importing the app stays within its cold-start budget
+
+Each module is imported in a fresh interpreter with -X importtime, and the
+median over several runs is compared to its budget. Modules that must stay
+lazy (model SDKs, LangGraph, LangSmith, NumPy) are also checked to not be
+imported by the API entry point at all.
+
+Usage:
+    python benchmarks/check_import_time.py [--runs N] [--scale S]
+
+Exits non-zero when a budget is exceeded, so CI can run it next to the
+pipeline benchmark. --scale multiplies every budget for slower machines.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time budget per module, in milliseconds
+BUDGETS_MS = {
+    "app.api.main": 600,
+    "app.core.workflow": 1000,
+}
+
+# Modules the API must not import until the first request or prewarm needs them
+LAZY_MODULES = ("langgraph", "langchain", "langchain_openai", "langsmith", "openai", "numpy")
+
+def import_time_ms(module: str) -> float:
+    """Import a module in a fresh interpreter and get its cumulative import time"""
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stderr
+    for line in reversed(output.splitlines()):
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"No import time reported for {module}")
+
+def eagerly_imported(module: str) -> list:
+    """List the lazy modules that importing a module pulls in"""
+    code = (
+        "import sys\n"
+        f"import {module}\n"
+        f"print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return output.split()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh imports per module")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget")
+    args = parser.parse_args()
+
+    failures = []
+    for module, budget in BUDGETS_MS.items():
+        samples = [import_time_ms(module) for _ in range(args.runs)]
+        median = statistics.median(samples)
+        limit = budget * args.scale
+        status = "ok" if median <= limit else "OVER BUDGET"
+        print(f"{module:<20} median {median:>8.1f} ms  budget {limit:>8.1f} ms  {status}")
+        if median > limit:
+            failures.append(f"{module} imports in {median:.1f} ms, budget {limit:.1f} ms")
+
+    eager = eagerly_imported("app.api.main")
+    print(f"{'app.api.main':<20} eager heavy imports: {', '.join(eager) or 'none'}")
+    if eager:
+        failures.append(f"app.api.main imports {', '.join(eager)} at import time")
+
+    if failures:
+        print("\nFailures:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
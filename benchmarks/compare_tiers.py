@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+"""Compare model tiers on latency and tokens per agent
+
+Reviews the sample resume once per configuration and run: each tier (or model
+name) given with --tiers, with every agent's chain set to it alone, and then
+the routed default, where the extractors start on the fast tier and escalate
+to the strong one. Reports each agent's calls, mean latency, prompt and
+completion tokens per call, parse failures and escalations, plus end-to-end
+review latency.
+
+This calls the configured provider, so it needs OPENAI_API_KEY and the
+MODEL_TIER_* settings; with LLM_PROVIDER=stub it runs offline against the
+replay model, which stands in for every tier.
+
+Usage:
+    python benchmarks/compare_tiers.py [--tiers fast,strong] [--runs N]
+        [--resume Resume.txt] [--jd jd.txt] [--json OUT]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Every agent whose chain the comparison sets
+AGENTS = (
+    "experience_extractor",
+    "education_extractor",
+    "skills_extractor",
+    "combined_extractor",
+    "job_profile_extractor",
+    "match_analyzer",
+    "score_generator",
+)
+
+def configure_environment(chain):
+    """Route every agent to one chain, or the defaults when chain is None, and skip the caches"""
+    os.environ["EXTRACTION_CACHE_ENABLED"] = "false"
+    os.environ["LANGSMITH_TRACING"] = "false"
+    os.environ["LANGCHAIN_TRACING_V2"] = "false"
+    for agent in AGENTS:
+        if chain is None:
+            os.environ.pop(f"MODEL_CHAIN_{agent.upper()}", None)
+        else:
+            os.environ[f"MODEL_CHAIN_{agent.upper()}"] = chain
+
+def read_agent_totals():
+    """Read the per-agent call, latency, token and failure totals recorded so far"""
+    from app.core.metrics import (
+        AGENT_LATENCY, COMPLETION_TOKENS, MODEL_ESCALATIONS, PARSE_FAILURES, PROMPT_TOKENS
+    )
+    totals = {}
+    def add(agent, field, value):
+        totals.setdefault(agent, {
+            "calls": 0, "seconds": 0.0, "prompt_tokens": 0.0, "completion_tokens": 0.0,
+            "parse_failures": 0.0, "escalations": 0.0
+        })[field] += value
+    for (agent,), (counts, total) in AGENT_LATENCY._values.items():
+        add(agent, "calls", sum(counts))
+        add(agent, "seconds", total)
+    for field, metric in (("prompt_tokens", PROMPT_TOKENS), ("completion_tokens", COMPLETION_TOKENS),
+                          ("parse_failures", PARSE_FAILURES)):
+        for (agent,), value in metric._values.items():
+            add(agent, field, value)
+    for (agent, _, _), value in MODEL_ESCALATIONS._values.items():
+        add(agent, "escalations", value)
+    return totals
+
+def difference(after, before):
+    """Get the per-agent totals added between two readings"""
+    result = {}
+    for agent, stats in after.items():
+        previous = before.get(agent, {})
+        delta = {field: value - previous.get(field, 0) for field, value in stats.items()}
+        if delta["calls"]:
+            result[agent] = delta
+    return result
+
+def bench_configuration(name, chain, runs, resume, job_description):
+    """Review the sample under one routing configuration"""
+    from app.core.models import get_model_chain
+    from app.core.registry import get_graph, reload_registry
+
+    reload_registry()
+    configure_environment(chain)
+    graph = get_graph()
+    inputs = {"resume": resume, "job_description": job_description}
+
+    before = read_agent_totals()
+    samples, failures = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        try:
+            result = graph.invoke(inputs)
+            if "review_result" not in result:
+                failures += 1
+        except Exception as e:
+            print(f"{name}: review failed: {e}", file=sys.stderr)
+            failures += 1
+        samples.append(time.perf_counter() - start)
+    agents = difference(read_agent_totals(), before)
+
+    samples.sort()
+    return {
+        "chains": {agent: get_model_chain(agent) for agent in AGENTS},
+        "review": {
+            "runs": runs,
+            "failures": failures,
+            "mean_ms": statistics.fmean(samples) * 1000,
+            "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+        },
+        "agents": {
+            agent: {
+                "calls": int(stats["calls"]),
+                "mean_ms": stats["seconds"] / stats["calls"] * 1000,
+                "prompt_tokens_per_call": stats["prompt_tokens"] / stats["calls"],
+                "completion_tokens_per_call": stats["completion_tokens"] / stats["calls"],
+                "parse_failures": int(stats["parse_failures"]),
+                "escalations": int(stats["escalations"]),
+            }
+            for agent, stats in sorted(agents.items())
+        },
+    }
+
+def print_report(results):
+    """Print one table per configuration"""
+    for name, result in results.items():
+        review = result["review"]
+        print(f"\n{name}: review mean {review['mean_ms']:.0f} ms, p95 {review['p95_ms']:.0f} ms, "
+              f"{review['failures']}/{review['runs']} failed")
+        print(f"  {'agent':<24}{'model':<28}{'calls':>6}{'mean ms':>10}{'prompt/call':>13}"
+              f"{'compl/call':>12}{'parse err':>11}{'escalated':>11}")
+        for agent, stats in result["agents"].items():
+            chain = " > ".join(result["chains"].get(agent) or ["?"])
+            print(f"  {agent:<24}{chain:<28}{stats['calls']:>6}{stats['mean_ms']:>10.0f}"
+                  f"{stats['prompt_tokens_per_call']:>13.0f}{stats['completion_tokens_per_call']:>12.0f}"
+                  f"{stats['parse_failures']:>11}{stats['escalations']:>11}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tiers", default="fast,strong", help="comma-separated tiers or model names to compare")
+    parser.add_argument("--runs", type=int, default=3, help="reviews per configuration")
+    parser.add_argument("--resume", default=os.path.join(ROOT, "Resume.txt"), help="resume to review")
+    parser.add_argument("--jd", default=os.path.join(ROOT, "jd.txt"), help="job description to review against")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+    if args.runs < 1:
+        parser.error("--runs must be at least 1")
+
+    with open(args.resume) as f:
+        resume = f.read()
+    with open(args.jd) as f:
+        job_description = f.read()
+
+    configurations = [(tier.strip(), tier.strip()) for tier in args.tiers.split(",") if tier.strip()]
+    configurations.append(("routed", None))
+
+    results = {}
+    for name, chain in configurations:
+        results[name] = bench_configuration(name, chain, args.runs, resume, job_description)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
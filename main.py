@@ -3,28 +3,132 @@
 AI Resume Reviewer using LangGraph, Swarm Agents, and LangSmith
 """
 import os
+import sys
 import json
+import time
+import asyncio
+import argparse
 from dotenv import load_dotenv
-from app.core.workflow import create_resume_review_graph
-from app.utils.logger import setup_logging
-from app.agents.extractors import Experience, Education, Skill
-from app.agents.analyzers import MatchAnalysis, ReviewResult
+from pydantic import BaseModel
 
-# Load environment variables
+# Load environment variables before the app modules below read them on import
 load_dotenv()
 
+from app.utils.logger import correlation_scope, setup_logging
+from app.utils.serialization import to_jsonable
+
 # Setup logging
 logger = setup_logging()
 
-# Custom JSON Encoder to handle our custom classes
+# Custom JSON Encoder to handle our pydantic models, whichever the workflow state holds
 class CustomEncoder(json.JSONEncoder):
     def default(self, obj):
-        if isinstance(obj, (Experience, Education, Skill, MatchAnalysis, ReviewResult)):
-            return obj.__dict__
+        if isinstance(obj, BaseModel):
+            return to_jsonable(obj)
         return super().default(obj)
 
+# Seconds between progress lines in batch mode
+PROGRESS_INTERVAL = 1.0
+
+def parse_args():
+    """Parse command-line options; without any, the example files are reviewed"""
+    parser = argparse.ArgumentParser(
+        description="Review resumes against job descriptions",
+        epilog="Without options, reviews resume.txt against jd.txt and writes result.json."
+    )
+    parser.add_argument("--resumes", nargs="+", metavar="PATH", help="resume files, directories or glob patterns")
+    parser.add_argument("--jds", nargs="+", metavar="PATH", help="job description files, directories or glob patterns")
+    parser.add_argument(
+        "--pairs",
+        metavar="FILE",
+        help="review only the 'resume,job_description' path pairs listed in FILE instead of every combination"
+    )
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--concurrency", type=int, default=None, help="pairs reviewed at once")
+    parser.add_argument("--restart", action="store_true", help="discard the output file instead of resuming from it")
+    args = parser.parse_args()
+    batch = args.resumes or args.jds or args.pairs
+    if batch and not args.pairs and not (args.resumes and args.jds):
+        parser.error("--resumes and --jds are both required unless --pairs is given")
+    if args.pairs and (args.resumes or args.jds):
+        parser.error("--pairs cannot be combined with --resumes or --jds")
+    if args.concurrency is not None and args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    args.batch = bool(batch)
+    return args
+
+async def run_batch(args) -> int:
+    """Review every requested pair, appending JSONL records and skipping pairs finished in earlier runs"""
+    from app.core.batch import (
+        expand_paths, format_duration, format_progress, get_batch_concurrency, load_checkpoint,
+        pair_key, read_pairs_file, review_pairs
+    )
+    
+    if args.pairs:
+        pairs = read_pairs_file(args.pairs)
+    else:
+        pairs = [
+            (resume_path, jd_path)
+            for resume_path in expand_paths(args.resumes)
+            for jd_path in expand_paths(args.jds)
+        ]
+    
+    # Each file is read once however many pairs it is in
+    texts = {}
+    for path in {path for pair in pairs for path in pair}:
+        with open(path, "r") as f:
+            texts[path] = f.read()
+    
+    if args.restart and os.path.exists(args.output):
+        os.remove(args.output)
+    done = load_checkpoint(args.output)
+    pending = [
+        (resume_path, jd_path)
+        for resume_path, jd_path in pairs
+        if pair_key(resume_path, jd_path, texts[resume_path], texts[jd_path]) not in done
+    ]
+    print(f"{len(pairs)} pairs: {len(pairs) - len(pending)} already reviewed, {len(pending)} to review", file=sys.stderr)
+    
+    concurrency = args.concurrency or get_batch_concurrency()
+    counts = {"ok": 0, "error": 0}
+    start = time.perf_counter()
+    last_report = start
+    with open(args.output, "a") as f:
+        async for record in review_pairs(pending, texts, concurrency):
+            # Each record is flushed as it completes, so an interrupted run loses nothing finished
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            counts[record["status"]] += 1
+            now = time.perf_counter()
+            finished = counts["ok"] + counts["error"]
+            if now - last_report >= PROGRESS_INTERVAL or finished == len(pending):
+                print(format_progress(finished, len(pending), now - start), file=sys.stderr)
+                last_report = now
+    
+    elapsed = time.perf_counter() - start
+    print(
+        f"Reviewed {counts['ok'] + counts['error']} pairs in {format_duration(elapsed)}: "
+        f"{counts['ok']} ok, {counts['error']} failed; results in {args.output}",
+        file=sys.stderr
+    )
+    return 1 if counts["error"] else 0
+
 def main():
     """Main entry point for the AI Resume Reviewer"""
+    args = parse_args()
+    if args.batch:
+        logger.info("Starting AI Resume Reviewer in batch mode")
+        try:
+            sys.exit(asyncio.run(run_batch(args)))
+        except (ValueError, OSError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            sys.exit(2)
+        except KeyboardInterrupt:
+            print(f"Interrupted; run the same command again to resume from {args.output}", file=sys.stderr)
+            sys.exit(130)
+    
+    from app.core.workflow import create_resume_review_graph
+    
     logger.info("Starting AI Resume Reviewer")
     
     # Create the LangGraph workflow
@@ -41,7 +145,8 @@ def main():
     }
     
     # Execute the graph
-    result = graph.invoke(inputs)
+    with correlation_scope():
+        result = graph.invoke(inputs)
     
     # Print the result
     print(f"Resume Review Result: {result}")
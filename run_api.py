@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 """Run the AI Resume Reviewer API server"""
+import argparse
 import os
 import uvicorn
 from dotenv import load_dotenv
@@ -7,20 +8,51 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+def parse_args():
+    """Parse command-line options, defaulting to the environment"""
+    parser = argparse.ArgumentParser(description="Run the AI Resume Reviewer API server")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"), help="interface to bind")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")), help="port to listen on")
+    parser.add_argument(
+        "--reload",
+        action="store_true",
+        default=os.getenv("RELOAD", "false").lower() == "true",
+        help="restart on code changes (development only)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("WORKERS", "1")),
+        help="server processes; they share caches, review jobs and provider limits"
+    )
+    parser.add_argument(
+        "--no-prewarm",
+        action="store_true",
+        help="skip building agents, the graph and model connections before serving"
+    )
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and args.reload:
+        parser.error("--reload only works with a single worker")
+    return args
+
 def main():
     """Start the API server"""
-    print("Starting AI Resume Reviewer API...")
-    
-    # Get port from environment or use default
-    port = int(os.getenv("PORT", "8000"))
-    
-    # Run server
+    args = parse_args()
+    if args.no_prewarm:
+        os.environ["PREWARM_ON_STARTUP"] = "false"
+
+    print(f"Starting AI Resume Reviewer API with {args.workers} worker(s)...")
+
+    # Run server; each worker process prewarms before it accepts requests
     uvicorn.run(
         "app.api.main:app",
-        host="0.0.0.0",
-        port=port,
-        reload=True
+        host=args.host,
+        port=args.port,
+        reload=args.reload,
+        workers=args.workers
     )
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()